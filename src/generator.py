@@ -5,8 +5,9 @@ import requests
 from io import BytesIO
 from PIL import Image
 
+import timing
 from managers.config_manager import ConfigManager
-from utils import get_openai_key
+from utils import get_openai_key, get_openai_url
 
 
 class ImageGenerator:
@@ -54,7 +55,7 @@ class OpenAIImageGenerator(ImageGenerator):
 
     @staticmethod
     def get_url():
-        return "https://api.openai.com/v1/images/generations"
+        return get_openai_url("images/generations")
 
     def generate(self, prompt: str) -> Image.Image:
         headers = {
@@ -69,12 +70,15 @@ class OpenAIImageGenerator(ImageGenerator):
         data["size"] = self.SIZE
         data["output_format"] = "png"
 
-        response = requests.post(self.get_url(), headers=headers, json=data, timeout=300)
+        with timing.span("generate"):
+            response = requests.post(self.get_url(), headers=headers, json=data, timeout=300)
         if response.status_code != 200:
             raise RuntimeError(f"OpenAI image generation {response.status_code}: {response.text.strip()}")
 
-        b64_image = response.json()["data"][0]["b64_json"]
-        image = Image.open(BytesIO(base64.b64decode(b64_image)))
+        with timing.span("decode"):
+            b64_image = response.json()["data"][0]["b64_json"]
+            image = Image.open(BytesIO(base64.b64decode(b64_image)))
+            image.load()
 
         return image
 
@@ -1,9 +1,11 @@
+import datetime
+import gc
 import logging
+import os
 import queue
-import random
 import threading
+import time
 
-import qrcode
 from PIL import Image, ImageTk
 
 import tkinter as tk
@@ -11,14 +13,17 @@ import customtkinter as ctk
 
 from managers.image_manager import ImageManager
 from managers.config_manager import ConfigManager
-from managers.voice_manager import VoiceManager, standard_recognize
+from managers.state_manager import StateManager
 from managers import sync_manager
-from prompt import speech_to_prompt, STYLE_ORDER, STYLE_PRESETS, STYLE_PLAIN
-from utils import fit_image
+from prompt import audio_to_prompt, speech_to_prompt, STYLE_ORDER, STYLE_PRESETS, STYLE_PLAIN
+import imaging
+import rotation
+import timing
+from utils import process_rss_bytes
 
 from gui_components import theme
 from gui_components.general import BlockButton, StyleTile
-from gui_components.history import GalleryItem
+from gui_components.history import GalleryItem, PLACEHOLDER_COLOR
 from gui_components.setting import SettingGroupLabel, SettingItem
 
 logger = logging.getLogger(__name__)
@@ -38,9 +43,50 @@ STYLE_TILE_COLORS = {
     "minimalist": "#dcdcdc",
 }
 
+# Config keys each App subsystem observes (see App._subscribe_configs).
+DISPLAY_CONFIG_KEYS = ("do_resize",)
+PROMPT_CONFIG_KEYS = ("enable_chatgpt", "single_pass_prompt")
+ROTATION_CONFIG_KEYS = (
+    "rotation_enabled", "rotation_mode", "rotation_interval", "quiet_start", "quiet_end",
+    "morning_style", "afternoon_style", "evening_style", "night_style",
+)
+
+# Uploaded images are applied to the UI when their batch completes, or this
+# long after the last one arrived if the batch never does.
+UPLOAD_FLUSH_FALLBACK_MS = 10000
+POWER_CONFIG_KEYS = ("idle_minutes", "idle_blank")
+
+# Cross-thread UI queue drain period. While idle the drain stops polling and
+# waits on a wake pipe instead (see _sleep_ui_drain); IDLE_UI_DRAIN_MS is the
+# fallback where Tk can't watch a pipe (Windows).
+UI_DRAIN_MS = 50
+IDLE_UI_DRAIN_MS = 500
+UI_DRAIN_SLICE_S = 0.03
+IDLE_CHECK_MS = 30000
+# During quiet hours, a frame woken by a tap goes back to idle this soon.
+QUIET_REIDLE_SECONDS = 120
+
 
 class ScrollableGalleryFrame(ctk.CTkScrollableFrame):
-    def __init__(self, master, width, height, aspect_ratio, image_manager, display_command=None, delete_command=None, **kwargs):
+    """The history gallery, built in the background.
+
+    A loader thread reads the history once and hands it to the Tk thread a
+    page at a time as blank placeholder tiles; a second thread renders the
+    thumbnails (from the small on-disk renditions, see
+    ImageManager.ensure_thumbnail) and hands them over a few at a time. At most
+    MAX_BATCHES_IN_FLIGHT batches wait in the UI queue, so neither memory nor
+    the main loop's work grows with the size of the history.
+
+    While pages are still arriving, tiles removed on the Tk thread are
+    remembered so a later page can't bring them back, and new tiles (NEW, an
+    upload batch) are held back and appended once the older records are in.
+    """
+
+    PAGE_SIZE = 12
+    THUMBNAIL_BATCH = 4
+    MAX_BATCHES_IN_FLIGHT = 2
+
+    def __init__(self, master, width, height, aspect_ratio, image_manager, run_on_ui, display_command=None, delete_command=None, **kwargs):
         super().__init__(master, **kwargs)
 
         self.width = width
@@ -55,22 +101,106 @@ class ScrollableGalleryFrame(ctk.CTkScrollableFrame):
         self.display_command = display_command
         self.delete_command = delete_command
         self.item_list = []
+        self._items = {}
+        # Tk thread only; see the class docstring.
+        self._loading = True
+        self._removed = set()
+        self._held = []
 
         self.image_manager = image_manager
-        for record in self.image_manager.get_all_records():
+        self.run_on_ui = run_on_ui
+        self._in_flight = threading.BoundedSemaphore(self.MAX_BATCHES_IN_FLIGHT)
+        self._thumbnail_queue = queue.Queue()
+        threading.Thread(target=self._load_records, name="gallery-records", daemon=True).start()
+        threading.Thread(target=self._load_thumbnails, name="gallery-thumbnails", daemon=True).start()
+
+    @property
+    def tile_size(self):
+        tile_width = self.width / 3 - theme.px(30)
+        return tile_width, tile_width * self.aspect_ratio
+
+    # ---- background loading (worker threads) ----
+    def _post(self, fn):
+        """Run `fn` on the Tk thread once fewer than MAX_BATCHES_IN_FLIGHT are queued."""
+        self._in_flight.acquire()
+
+        def _run():
             try:
-                self.add_item(record)
-            except Exception as e:
-                logger.warning(f"Skipping gallery item {record.uuid}: {e}")
+                fn()
+            finally:
+                self._in_flight.release()
+
+        self.run_on_ui(_run)
+
+    def _load_records(self):
+        # One snapshot, so deletes and additions on the Tk thread can't shift
+        # the pages under the loader.
+        try:
+            records = self.image_manager.get_all_records()
+        except Exception as e:
+            logger.warning(f"Gallery could not load the history: {e}")
+            records = []
+        for start in range(0, len(records), self.PAGE_SIZE):
+            page = records[start:start + self.PAGE_SIZE]
+            self._post(lambda page=page: self._add_placeholders(page))
+        self._post(self._finish_loading)
+
+    def _load_thumbnails(self):
+        width, height = (int(v) for v in self.tile_size)
+        while True:
+            batch = [self._thumbnail_queue.get()]
+            while len(batch) < self.THUMBNAIL_BATCH:
+                try:
+                    batch.append(self._thumbnail_queue.get_nowait())
+                except queue.Empty:
+                    break
+            rendered = []
+            for uuid in batch:
+                try:
+                    path = self.image_manager.ensure_thumbnail(uuid)
+                    if path is None:
+                        continue
+                    rendered.append((uuid, imaging.get_service().fit_file(
+                        path, width, height, background=PLACEHOLDER_COLOR, quality=imaging.QUALITY_FAST,
+                    )))
+                except Exception as e:
+                    logger.warning(f"No thumbnail for gallery item {uuid}: {e}")
+            if rendered:
+                self._post(lambda rendered=rendered: self._fill_thumbnails(rendered))
+
+    # ---- Tk thread ----
+    def _add_placeholders(self, records):
+        for record in records:
+            if record.uuid not in self._items and record.uuid not in self._removed:
+                self._add_tile(record)
+
+    def _finish_loading(self):
+        held, self._held = self._held, []
+        self._add_placeholders(held)
+        self._loading = False
+        self._removed.clear()
+
+    def _fill_thumbnails(self, rendered):
+        for uuid, pil_image in rendered:
+            item = self._items.get(uuid)
+            if item is not None:
+                item.set_image(pil_image)
 
     def add_item(self, record):
+        """Append a placeholder tile for `record`; its thumbnail loads in the background."""
+        if self._loading:
+            self._held.append(record)
+            return
+        self._add_tile(record)
+
+    def _add_tile(self, record):
+        tile_width, tile_height = self.tile_size
         item = GalleryItem(
             self,
-            self.width / 3 - theme.px(30),
-            (self.width / 3 - theme.px(30)) * self.aspect_ratio,
+            tile_width,
+            tile_height,
             record.uuid, 
             record.title, 
-            self.image_manager.uuid_to_path(record.uuid), 
             display_command=self.display_command, 
             delete_command=self.delete_command
         )
@@ -79,13 +209,24 @@ class ScrollableGalleryFrame(ctk.CTkScrollableFrame):
         target_row, target_col = divmod(cur_len, 3)
         item.grid(row=target_row, column=target_col, columnspan=1, pady=(theme.px(25), theme.px(25)), padx=(theme.px(15), theme.px(15)))
         self.item_list.append(item)
+        self._items[record.uuid] = item
+        self._thumbnail_queue.put(record.uuid)
+
+    def add_items(self, records):
+        """Append several records in one pass (e.g. a finished upload batch)."""
+        for record in records:
+            try:
+                self.add_item(record)
+            except Exception as e:
+                logger.warning(f"Skipping gallery item {record.uuid}: {e}")
 
     def remove_item(self, uuid):
-        for it in self.item_list:
-            if uuid == it.uuid:
-                it.destroy()
-                self.item_list.remove(it)
-                break
+        if self._loading:
+            self._removed.add(uuid)
+        item = self._items.pop(uuid, None)
+        if item is not None:
+            item.destroy()
+            self.item_list.remove(item)
 
         for i, it in enumerate(self.item_list):
             target_row, target_col = divmod(i, 3)
@@ -105,33 +246,65 @@ class ScrollableSettingFrame(ctk.CTkScrollableFrame):
         self.has_change = False
 
         self.setting_items = {}
+        self._setting_widgets = []
+        self._schema_signature = None
         self.update_setting()
 
     def _on_change(self):
         self.has_change = True
 
-    def update_setting(self):
+    def _current_schema_signature(self):
+        return tuple(
+            (group.name, group.label, tuple(
+                (item.name, item.label, item.type, repr(item.range), item.editable)
+                for item in group.items
+            ))
+            for group in self.config_manager.get_all_configs()
+        )
+
+    def _build_setting_widgets(self):
+        for widget in self._setting_widgets:
+            widget.destroy()
+        self._setting_widgets = []
         self.setting_items = {}
+
         row_id = 0
         for config_group in self.config_manager.get_all_configs():
             setting_group_label = SettingGroupLabel(self, self.width, theme.px(50), config_group.label)
             setting_group_label.grid(row=row_id, column=0, pady=(theme.px(35), 0))
+            self._setting_widgets.append(setting_group_label)
             row_id += 1
             for config in config_group.items:
-                self.setting_items[config.name] = SettingItem(self, self.width, theme.px(50), config, command=self._on_change)
-                self.setting_items[config.name].set(config.value)
-                self.setting_items[config.name].grid(row=row_id, column=0)
+                item = SettingItem(self, self.width, theme.px(50), config, command=self._on_change)
+                item.grid(row=row_id, column=0)
+                self.setting_items[config.name] = item
+                self._setting_widgets.append(item)
                 row_id += 1
 
+    def update_setting(self):
+        """Show the current config values. The widget tree is built once and
+        only rebuilt if the config schema itself changed; otherwise the existing
+        inputs are just refreshed, so reopening settings creates no widgets."""
+        signature = self._current_schema_signature()
+        if signature != self._schema_signature:
+            self._build_setting_widgets()
+            self._schema_signature = signature
+
+        for config_group in self.config_manager.get_all_configs():
+            for config in config_group.items:
+                self.setting_items[config.name].set(config.value)
+        self.has_change = False
+
     def save_setting(self):
         if self.has_change:
-            for key, item in self.setting_items.items():
-                self.config_manager.set_config_value(key, item.get())
+            with self.config_manager.batch():
+                for key, item in self.setting_items.items():
+                    self.config_manager.set_config_value(key, item.get())
             self.has_change = False
 
 
 class App(ctk.CTk):
-    def __init__(self, windowed=False):
+    def __init__(self, windowed=False, snapshot_dir=None):
         super().__init__()
 
         # PC debug: a scaled-down window instead of fullscreen. `theme` drives the
@@ -144,35 +317,68 @@ class App(ctk.CTk):
         self.image_uuid = None
         self.do_resize = True
         self.enable_chatgpt = True
+        self.single_pass_prompt = False
 
         self.image_manager: ImageManager = None
         self.config_manager: ConfigManager = None
+        self.state_manager: StateManager = None
 
         self.upload_server = None
+        self.update_checker = None
 
         # Cross-thread GUI updates (upload server / sync worker) are marshaled
         # onto the Tk main thread through this queue, drained by _drain_ui_queue.
         self._ui_queue = queue.Queue()
+        self._drain_after_id = None
+        # While idle the drain loop is parked: run_on_ui writes a byte to this
+        # pipe and Tk's file handler restarts the loop.
+        self._ui_sleeping = False
+        self._wake_pipe = None
+        if hasattr(self.tk, "createfilehandler"):
+            self._wake_pipe = os.pipe()
+            for fd in self._wake_pipe:
+                os.set_blocking(fd, False)
+
+        # Uploaded records waiting to be applied to the UI as one batch.
+        self._pending_uploads = []
+        self._pending_uploads_lock = threading.Lock()
+        self._upload_flush_after_id = None
 
         # Auto-rotation (slideshow) state.
         self.rotation_enabled = False
         self.rotation_mode = "sequential"
         self.rotation_interval = 10
         self._rotation_after_id = None
+        self.rotation = None
+        self.rotation_schedule = rotation.Schedule()
+
+        # Idle (power-saving) mode, see enter_idle().
+        self.idle = False
+        self.idle_minutes = 0
+        self.idle_blank = False
+        self._idle_reason = None
+        self._idle_since = None
+        self._last_interaction = time.monotonic()
+        self._ui_drain_ms = UI_DRAIN_MS
+        self._idle_check_after_id = None
 
         self.qr_image_buffer = None
+        # Set once the first image is on screen (see set_image).
+        self.first_paint_done = False
+
+        # Fitted images recently shown, keyed by (uuid, width, height, do_resize).
+        self.display_cache = imaging.DisplayImageCache()
+        # Latest image requested by set_image(); older fits still in flight
+        # when it changes are cached but not painted.
+        self._pending_display = None
+        # Warm state left by the previous process (see adopt_handoff).
+        self._handoff_threshold = None
 
         # Style chosen on the NEW picker for the next generation (see prompt.py).
         self._pending_style = STYLE_PLAIN
 
-        self.voice_control = VoiceManager()
-        self.voice_control.register_trigger_phrases(
-            ["generate"], self.voice_callback_newimage,
-            wait_start_callback=lambda: self.run_on_ui(self.show_listen_progressbar),
-            wait_end_callback=lambda: self.run_on_ui(self.hide_listen_progressbar),
-            modal=True
-        )
-        self.voice_control.start()
+        # Created on the first NEW tap (see _get_voice_control).
+        self.voice_control = None
 
         # Logical frame is 1080x1920; theme.px applies the active scale, so the
         # windowed debug build is a true shrink (540x960 at scale 0.5).
@@ -200,6 +406,7 @@ class App(ctk.CTk):
         # canvas
         self.canvas = tk.Canvas(self, width=self.width, height=self.height, highlightthickness=0)
         self.canvas.bind("<Button-1>", self.show_overlay)
+        self.bind_all("<ButtonPress>", self._note_interaction, add="+")
         # self.canvas.pack(fill="both", expand=True)
         self.canvas.place(relx=0.5, y=0, anchor="n", width=self.width, height=self.height)
 
@@ -207,6 +414,16 @@ class App(ctk.CTk):
         self.picture_image_buffer = ImageTk.PhotoImage(Image.new("RGB", (self.width, self.image_height), (0, 0, 0)))
         self.picture_buffer = self.canvas.create_image(self.width // 2, self.image_height // 2, image=self.picture_image_buffer, anchor=tk.CENTER)
 
+        # Snapshot of the last displayed frame, shown before any manager loads.
+        self.snapshot_path = None
+        if snapshot_dir:
+            self.snapshot_path = os.path.join(snapshot_dir, f".frame-{self.width}x{self.image_height}.ppm")
+        self._snapshot_uuid = None
+        # (fitted image, uuid) on screen now, for _save_snapshot.
+        self._shown_image = None
+        self._snapshot_lock = threading.Lock()
+        self._paint_snapshot()
+
         # overlay: a single dim layer behind the menu, toggled by fade()
         self.overlay_active = False
         self.overlay_image_buffer = ImageTk.PhotoImage(
@@ -245,33 +462,26 @@ class App(ctk.CTk):
         self.setting_save_button = BlockButton(self, "save", "#8df0ad", theme.FONT_SIZE_BODY, command=self.save_setting)
         self.setting_close_button = BlockButton(self, "cancel", "#ff5447", theme.FONT_SIZE_BODY, command=self.hide_setting_frame)
 
-        # upload info overlay (URL + QR code)
-        self.upload_frame = tk.Frame(self, bg="#141414")
-        self.upload_qr_label = tk.Label(self, bg="#fffef5", bd=0, highlightthickness=0)
-        self.upload_title_label = tk.Label(self, text="UPLOAD IMAGES", bg="#141414", fg="#fff7e3", font=theme.font(theme.FONT_SIZE_TITLE))
-        self.upload_url_label = tk.Label(self, bg="#141414", fg="#8df0ad", font=theme.font(theme.FONT_SIZE_HEADING))
-        self.upload_hint_label = tk.Label(self, bg="#141414", fg="#b9b29c", font=theme.font(theme.FONT_SIZE_CAPTION, "normal"), wraplength=theme.px(560), justify="center")
-        self.upload_close_button = BlockButton(self, "close", "#b3b3b3", theme.FONT_SIZE_BODY, command=self.hide_upload_info)
-
-        # style picker (NEW -> choose a style): a borderless 3x3 grid of tiles
-        # (Plain in the center) that fills its container edge-to-edge, with a
-        # full-width cancel bar flush beneath it.
+        # upload info overlay and style picker: built on first use
+        # (_build_upload_widgets / _build_style_widgets), not at startup.
+        self.upload_frame = None
         self.style_tiles = []
-        for sid in STYLE_ORDER:
-            color = STYLE_TILE_COLORS.get(sid, "#b3b3b3")
-            tile = StyleTile(
-                self, STYLE_PRESETS[sid]["label"], color,
-                command=lambda s=sid: self._on_style_selected(s),
-            )
-            self.style_tiles.append(tile)
-        self.style_cancel_button = BlockButton(self, "cancel", "#ff5447", theme.FONT_SIZE_BODY, command=self.hide_style_picker)
+        self.style_cancel_button = None
 
         # Drain cross-thread UI work on the main loop.
-        self.after(50, self._drain_ui_queue)
+        self._drain_after_id = self.after(self._ui_drain_ms, self._drain_ui_queue)
 
     def _drain_ui_queue(self):
+        # Time-sliced: after UI_DRAIN_SLICE_S of work, yield to Tk (input,
+        # redraws) and come back for the rest right away.
+        self._drain_after_id = None
+        deadline = time.monotonic() + UI_DRAIN_SLICE_S
+        delay = self._ui_drain_ms
         try:
             while True:
+                if time.monotonic() >= deadline:
+                    delay = 1
+                    break
                 fn = self._ui_queue.get_nowait()
                 try:
                     fn()
@@ -279,47 +489,132 @@ class App(ctk.CTk):
                     logger.error(f"UI task error: {e}")
         except queue.Empty:
             pass
-        self.after(50, self._drain_ui_queue)
+        if self.idle and delay != 1 and self._sleep_ui_drain():
+            return
+        self._drain_after_id = self.after(delay, self._drain_ui_queue)
+
+    def _sleep_ui_drain(self):
+        """Park the drain loop until run_on_ui has work, so an idle frame
+        doesn't wake the CPU to poll an empty queue."""
+        if self._wake_pipe is None:
+            return False
+        self._ui_sleeping = True
+        # run_on_ui puts before it checks _ui_sleeping, so work queued before
+        # the flag was set is seen here and anything later writes the pipe.
+        if not self._ui_queue.empty():
+            self._ui_sleeping = False
+            return False
+        self.tk.createfilehandler(self._wake_pipe[0], tk.READABLE, self._on_ui_wake)
+        return True
+
+    def _on_ui_wake(self, fd=None, mask=None):
+        if not self._ui_sleeping:
+            return
+        self.tk.deletefilehandler(self._wake_pipe[0])
+        self._ui_sleeping = False
+        try:
+            while os.read(self._wake_pipe[0], 4096):
+                pass
+        except BlockingIOError:
+            pass
+        self._drain_ui_queue()
 
     def run_on_ui(self, fn):
         """Schedule `fn` to run on the Tk main thread (safe from any thread)."""
         self._ui_queue.put(fn)
+        if self._ui_sleeping:
+            try:
+                os.write(self._wake_pipe[1], b"\0")
+            except BlockingIOError:
+                pass  # the pipe is full, so a wake-up is already pending
 
     def set_upload_server(self, server):
         self.upload_server = server
 
     def configure_general_configs(self):
-        do_resize = self.config_manager.get_config_value("do_resize", do_raise=False)
-        if do_resize is not None:
-            self.do_resize = do_resize
+        """Initial read of every setting. Later changes arrive per key through
+        the observers registered in _subscribe_configs."""
+        self._apply_display_configs()
 
-        current_image_uuid = self.config_manager.get_config_value("current_image", do_raise=False)
+        current_image_uuid = self.state_manager.get("current_image")
         if current_image_uuid:
             self.set_image(current_image_uuid)
         else:
             if last_record := self.image_manager.get_last_record():
                 self.set_image(last_record.uuid)
 
+        self._apply_prompt_configs()
+        self._apply_rotation_configs()
+        self._apply_power_configs()
+
+    def _apply_display_configs(self):
+        do_resize = self.config_manager.get_config_value("do_resize", do_raise=False)
+        if do_resize is not None:
+            self.do_resize = do_resize
+
+    def _apply_prompt_configs(self):
         enable_chatgpt = self.config_manager.get_config_value("enable_chatgpt", do_raise=False)
         self.enable_chatgpt = True if enable_chatgpt is None else enable_chatgpt
+        self.single_pass_prompt = bool(self.config_manager.get_config_value("single_pass_prompt", do_raise=False))
 
+    def _apply_rotation_configs(self):
         self.rotation_enabled = bool(self.config_manager.get_config_value("rotation_enabled", do_raise=False))
-        self.rotation_mode = self.config_manager.get_config_value("rotation_mode", do_raise=False) or "sequential"
+        self.rotation_mode = self.config_manager.get_config_value("rotation_mode", do_raise=False) or rotation.MODE_SEQUENTIAL
+        self.rotation.set_mode(self.rotation_mode)
+        get = lambda name, default: self.config_manager.get_config_value(name, do_raise=False) or default
+        self.rotation_schedule = rotation.Schedule(
+            quiet_start=get("quiet_start", 0),
+            quiet_end=get("quiet_end", 0),
+            styles={part: get(f"{part}_style", rotation.ANY_STYLE) for part, _, _ in rotation.DAY_PARTS},
+        )
         self.rotation_interval = self.config_manager.get_config_value("rotation_interval", do_raise=False) or 10
         self._reschedule_rotation()
 
-    def set_managers(self, image_manager: ImageManager, config_manager: ConfigManager):
+    def _apply_power_configs(self):
+        self.idle_minutes = self.config_manager.get_config_value("idle_minutes", do_raise=False) or 0
+        self.idle_blank = bool(self.config_manager.get_config_value("idle_blank", do_raise=False))
+
+    def _subscribe_configs(self):
+        # Each subsystem reacts only to its own keys, so saving e.g. `quality`
+        # doesn't reschedule rotation or re-decode the displayed image.
+        self.config_manager.subscribe(
+            self.image_manager.generator_config_keys(),
+            lambda changes: self.image_manager.update_generator_config(self.config_manager),
+        )
+        self.config_manager.subscribe(DISPLAY_CONFIG_KEYS, self._on_display_configs_changed)
+        self.config_manager.subscribe(PROMPT_CONFIG_KEYS, lambda changes: self._apply_prompt_configs())
+        self.config_manager.subscribe(ROTATION_CONFIG_KEYS, lambda changes: self._apply_rotation_configs())
+        self.config_manager.subscribe(POWER_CONFIG_KEYS, lambda changes: self._apply_power_configs())
+
+    def _on_display_configs_changed(self, changes):
+        self._apply_display_configs()
+        if self.image_uuid:
+            self.set_image(self.image_uuid)
+
+    def set_managers(self, image_manager: ImageManager, config_manager: ConfigManager, state_manager: StateManager):
         self.image_manager = image_manager
         self.config_manager = config_manager
+        self.state_manager = state_manager
+        self.rotation = rotation.RotationEngine(state_manager)
+        self.rotation.load(self.image_manager.get_all_records())
         self.image_manager.update_generator_config(self.config_manager)
         self.configure_general_configs()
-
+        self._subscribe_configs()
+        self._arm_idle_check(IDLE_CHECK_MS)
+
+    def build_panels(self):
+        """Build the history and setting panels. Called after the first paint
+        (see main.py) so they don't delay the picture appearing, or on demand
+        if a panel is opened before that."""
+        if self.history_frame is not None:
+            return
         self.history_frame = ScrollableGalleryFrame(
             self, 
             self.history_frame_width, 
             self.history_frame_height,
             float(self.image_height) / float(self.width), 
             self.image_manager, 
+            self.run_on_ui,
             display_command=self.gallary_display_command,
             delete_command=self.gallary_delete_command,
             label_text=" ", 
@@ -343,6 +638,8 @@ class App(ctk.CTk):
     
     def gallary_delete_command(self, uuid):
         self.image_manager.delete_record(uuid)
+        self.display_cache.discard(lambda key: key[0] == uuid)
+        self.rotation.remove(uuid)
         all_records = self.image_manager.get_all_records()
 
         if len(all_records) == 0:
@@ -351,27 +648,121 @@ class App(ctk.CTk):
             if uuid == self.image_uuid:
                 self.set_image(self.image_manager.get_last_record().uuid)
 
-        self.history_frame.remove_item(uuid)
+        if self.history_frame is not None:
+            self.history_frame.remove_item(uuid)
     
     def set_empty_image(self):
         self.picture_image_buffer = ImageTk.PhotoImage(Image.new("RGBA", (self.width, self.image_height), (0, 0, 0, 255)))
         self.canvas.itemconfig(self.picture_buffer, image=self.picture_image_buffer)
         self.image_uuid = None
+        self._pending_display = None
+        self._shown_image = None
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            os.remove(self.snapshot_path)
+        self._snapshot_uuid = None
+
+    def set_image(self, image_uuid, on_shown=None):
+        """Show `image_uuid`. A cached image is painted at once; otherwise it
+        is fitted on the imaging pool and painted when ready, without blocking
+        the Tk thread. `on_shown()` is called (on the Tk thread) once it is up."""
+        if not self.first_paint_done and image_uuid == self._snapshot_uuid:
+            # Already on screen from the boot snapshot; skip the decode.
+            self.image_uuid = image_uuid
+            self.first_paint_done = True
+            self.state_manager.set("current_image", image_uuid)
+            if on_shown is not None:
+                on_shown()
+            return
+
+        cache_key = (image_uuid, self.width, self.image_height, self.do_resize)
+        self._pending_display = image_uuid
+        image = self.display_cache.get(cache_key)
+        if image is not None:
+            self._show_image(image_uuid, image, True, on_shown)
+            return
 
-    def set_image(self, image_uuid):
         image_path = self.image_manager.uuid_to_path(image_uuid)
+        if self.do_resize and self.first_paint_done:
+            def _fitted(image, error):
+                self.run_on_ui(lambda: self._show_fitted(image_uuid, cache_key, image, error, on_shown))
+
+            imaging.get_service().fit_file_async(image_path, self.width, self.image_height, _fitted)
+            return
+
         try:
-            image = Image.open(image_path)
+            if self.do_resize:
+                # The first paint runs inline rather than wait for the pool to spawn.
+                image = imaging.get_service().fit_file(image_path, self.width, self.image_height, inline=True)
+            else:
+                with Image.open(image_path) as source:
+                    source.load()
+                    image = source.copy()
         except Exception as e:
-            logger.warning(f"Could not open image {image_uuid}: {e}")
+            self._show_fitted(image_uuid, cache_key, None, e, on_shown)
+        else:
+            self._show_fitted(image_uuid, cache_key, image, None, on_shown)
+
+    def _show_fitted(self, image_uuid, cache_key, image, error, on_shown):
+        loaded = error is None
+        if loaded:
+            self.display_cache.put(cache_key, image)
+        else:
+            logger.warning(f"Could not open image {image_uuid}: {error}")
             image = Image.new("RGBA", (self.width, self.image_height), (0, 0, 0, 255))
+        if self._pending_display != image_uuid:
+            # A newer set_image() took over while this one was being fitted.
+            if on_shown is not None:
+                on_shown()
+            return
+        self._show_image(image_uuid, image, loaded, on_shown)
 
-        if self.do_resize:
-            image = fit_image(image, self.width, self.image_height)
+    def _show_image(self, image_uuid, image, loaded, on_shown):
+        self._shown_image = (image, image_uuid) if loaded else None
         self.picture_image_buffer = ImageTk.PhotoImage(image)
         self.canvas.itemconfig(self.picture_buffer, image=self.picture_image_buffer)
         self.image_uuid = image_uuid
-        self.config_manager.set_config_value("current_image", image_uuid)
+        self.first_paint_done = True
+        # Changes on every rotation tick: runtime state, written behind.
+        self.state_manager.set("current_image", image_uuid)
+        if on_shown is not None:
+            on_shown()
+
+    # ---- boot snapshot ----
+    def _paint_snapshot(self):
+        """Show the frame saved by _save_snapshot. Tk reads the PPM itself, so
+        this costs one file read and no PIL decode or fit."""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            self.picture_image_buffer = tk.PhotoImage(file=self.snapshot_path)
+        except tk.TclError as e:
+            logger.warning(f"Could not load frame snapshot: {e}")
+            return
+        self.canvas.itemconfig(self.picture_buffer, image=self.picture_image_buffer)
+        self._snapshot_uuid = imaging.read_snapshot_tag(self.snapshot_path)
+
+    def _save_snapshot(self, background=False):
+        """Write the frame on screen to snapshot_path, unless it is already
+        there. A snapshot is a ~6 MB file, so this runs on exit, before a
+        restart and when going idle, not on every image change; after a power
+        cut the boot shows the last saved frame until the real one is up."""
+        shown = self._shown_image
+        if not self.snapshot_path or shown is None or shown[1] == self._snapshot_uuid:
+            return
+        if background:
+            threading.Thread(target=self._write_snapshot, args=shown, name="frame-snapshot", daemon=True).start()
+        else:
+            self._write_snapshot(*shown)
+
+    def _write_snapshot(self, image, image_uuid):
+        with self._snapshot_lock:
+            if image_uuid == self._snapshot_uuid:
+                return
+            try:
+                imaging.write_snapshot(self.snapshot_path, image, image_uuid)
+                self._snapshot_uuid = image_uuid
+            except OSError as e:
+                logger.warning(f"Could not write frame snapshot: {e}")
 
     def fade(self, direction):
         state = 'normal' if direction == "in" else 'hidden'
@@ -402,6 +793,10 @@ class App(ctk.CTk):
         self.exit_button.place_forget()
 
     def show_overlay(self, event=None):
+        if self.idle:
+            # The first tap only wakes the frame.
+            self.wake()
+            return
         if not self.overlay_active:
             self.overlay_active = True
             self._cancel_rotation()
@@ -438,6 +833,25 @@ class App(ctk.CTk):
         self.listen_text.set(text)
         self.update()
 
+    def _throttled_status(self, render, interval=0.25):
+        """Status updater for high-rate producers (e.g. streamed tokens).
+
+        Returns a callable safe to use from any thread; it renders its argument
+        with `render` and pushes it to the status box through run_on_ui at most
+        once per `interval` seconds, so the Tk queue isn't flooded per token.
+        The caller shows the final text itself once the producer is done.
+        """
+        last_push = [0.0]
+
+        def _update(value):
+            now = time.monotonic()
+            if now - last_push[0] >= interval:
+                last_push[0] = now
+                text = render(value)
+                self.run_on_ui(lambda: self.update_listen_status(text))
+
+        return _update
+
     def hide_listen_status(self):
         self.listen_status.place_forget()
         self.listen_frame.place_forget()
@@ -458,7 +872,20 @@ class App(ctk.CTk):
             return
         self.show_upload_info(self.upload_server.get_url())
 
+    def _build_upload_widgets(self):
+        # upload info overlay (URL + QR code)
+        self.upload_frame = tk.Frame(self, bg="#141414")
+        self.upload_qr_label = tk.Label(self, bg="#fffef5", bd=0, highlightthickness=0)
+        self.upload_title_label = tk.Label(self, text="UPLOAD IMAGES", bg="#141414", fg="#fff7e3", font=theme.font(theme.FONT_SIZE_TITLE))
+        self.upload_url_label = tk.Label(self, bg="#141414", fg="#8df0ad", font=theme.font(theme.FONT_SIZE_HEADING))
+        self.upload_hint_label = tk.Label(self, bg="#141414", fg="#b9b29c", font=theme.font(theme.FONT_SIZE_CAPTION, "normal"), wraplength=theme.px(560), justify="center")
+        self.upload_close_button = BlockButton(self, "close", "#b3b3b3", theme.FONT_SIZE_BODY, command=self.hide_upload_info)
+
     def show_upload_info(self, url):
+        import qrcode  # only needed here; kept off the startup path
+
+        if self.upload_frame is None:
+            self._build_upload_widgets()
         qr_size = theme.px(460)
         try:
             qr = qrcode.make(url).convert("RGB").resize((qr_size, qr_size), Image.NEAREST)
@@ -491,15 +918,65 @@ class App(ctk.CTk):
         self.show_menu()
 
     def handle_uploaded_image(self, pil_image, title):
-        """Ingest an uploaded image. Called from the web-server worker thread."""
-        record = self.image_manager.save_uploaded_image(pil_image, title)
+        """Ingest an uploaded image. Called from an upload worker thread.
 
-        def _apply():
-            self.history_frame.add_item(record)
-            if not self.overlay_active:
-                self.set_image(record.uuid)
+        The record is only queued for the UI; handle_upload_batch_end applies a
+        whole batch at once so a 30-image upload builds its gallery tiles in one
+        pass and decodes just the last image for display.
+        """
+        record = self.image_manager.save_uploaded_image(pil_image, title)
+        self.handle_uploaded_record(record)
+        return record
+
+    def handle_uploaded_record(self, record):
+        """Queue an already-stored upload for the UI (any thread; also used by
+        the out-of-process upload server)."""
+        with self._pending_uploads_lock:
+            self._pending_uploads.append(record)
+        self.run_on_ui(self._schedule_upload_flush)
+
+    def handle_upload_batch_end(self, batch_id=None):
+        """Called (from any thread) when every file of an upload batch is processed."""
+        self.run_on_ui(self._flush_uploads)
+
+    def handle_api_display(self, uuid):
+        """Show a record requested through the web gallery API (any thread)."""
+        self.run_on_ui(lambda: (self.wake(repaint=False), self.set_image(uuid)))
+
+    def handle_api_delete(self, uuid):
+        """Delete a record requested through the web gallery API (any thread)."""
+        self.run_on_ui(lambda: self.gallary_delete_command(uuid))
+
+    def handle_api_update(self, record):
+        """A record changed through the web gallery API, e.g. favorited (any thread)."""
+        self.run_on_ui(lambda: self.rotation.update(record))
+
+    def _schedule_upload_flush(self):
+        # Fallback for batches that never complete (e.g. the phone went away
+        # mid-upload), so their records still reach the gallery. Re-armed on
+        # every record: it only fires once uploads have stopped arriving, so a
+        # slow batch is still applied in one pass.
+        if self._upload_flush_after_id is not None:
+            self.after_cancel(self._upload_flush_after_id)
+        self._upload_flush_after_id = self.after(UPLOAD_FLUSH_FALLBACK_MS, self._flush_uploads)
+
+    def _flush_uploads(self):
+        if self._upload_flush_after_id is not None:
+            self.after_cancel(self._upload_flush_after_id)
+            self._upload_flush_after_id = None
+        with self._pending_uploads_lock:
+            records, self._pending_uploads = self._pending_uploads, []
+        if not records:
+            return
 
-        self.run_on_ui(_apply)
+        # Without the gallery yet, build_panels() loads these from the records.
+        if self.history_frame is not None:
+            self.history_frame.add_items(records)
+        for record in records:
+            self.rotation.add(record)
+        self.wake(repaint=self.overlay_active)
+        if not self.overlay_active:
+            self.set_image(records[-1].uuid)
 
     # ---- code sync ----
     def button_command_sync(self):
@@ -508,16 +985,26 @@ class App(ctk.CTk):
         self.update_listen_status("Starting sync...")
         threading.Thread(target=self._run_sync, daemon=True).start()
 
-    def _run_sync(self):
-        result = sync_manager.perform_sync(
-            status=lambda msg: self.run_on_ui(lambda m=msg: self.update_listen_status(m))
+    def start_update_checks(self):
+        """Fetch in the background and flag the SYNC button once an update is staged."""
+        self.update_checker = sync_manager.UpdateChecker(
+            on_update=lambda staged: self.run_on_ui(lambda: self.sync_button.set_text("update")),
         )
+        self.update_checker.start()
+
+    def _run_sync(self):
+        status = lambda msg: self.run_on_ui(lambda m=msg: self.update_listen_status(m))
+        if self.update_checker is not None:
+            result = self.update_checker.sync(status)
+        else:
+            result = sync_manager.perform_sync(status)
 
         def _finish():
             self.update_listen_status(result["message"])
             if result["ok"] and result["updated"]:
                 self.after(1200, self._restart_app)
             else:
+                self.sync_button.set_text("sync")
                 self.after(3500, self._dismiss_sync)
 
         self.run_on_ui(_finish)
@@ -526,9 +1013,53 @@ class App(ctk.CTk):
         self.hide_listen_status()
         self.hide_overlay()
 
+    def _stop_upload_server(self):
+        if self.upload_server is not None:
+            try:
+                self.upload_server.stop()
+            except Exception as e:
+                logger.warning(f"Could not stop upload server: {e}")
+            self.upload_server = None
+
+    def export_handoff(self, upload_server=None) -> dict:
+        """State worth carrying into the restarted process (see
+        sync_manager.write_handoff). `upload_server` is the stopped server
+        whose queued uploads the next process should resume. The rotation
+        cursor is not included: it is runtime state and reaches the next
+        process via state.json."""
+        threshold = self._handoff_threshold
+        if self.voice_control is not None and self.voice_control.calibrated:
+            threshold = self.voice_control.recognizer.energy_threshold
+        return {
+            "energy_threshold": threshold,
+            "upload_jobs": upload_server.pending_jobs() if hasattr(upload_server, "pending_jobs") else {},
+        }
+
+    def adopt_handoff(self, handoff: dict):
+        """Take over the previous process's microphone threshold (applied when
+        voice control starts)."""
+        self._handoff_threshold = handoff.get("energy_threshold")
+
     def _restart_app(self):
+        if self.update_checker is not None:
+            self.update_checker.stop()
         try:
-            self.voice_control.stop()
+            if self.voice_control is not None:
+                self.voice_control.stop()
+        except Exception:
+            pass
+        # Stop the upload server first so its queue can no longer change.
+        upload_server = self.upload_server
+        self._stop_upload_server()
+        try:
+            sync_manager.write_handoff(self.export_handoff(upload_server))
+        except Exception as e:
+            logger.warning(f"Could not write the handoff: {e}")
+        imaging.shutdown_service()
+        self._save_snapshot()
+        try:
+            self.config_manager.flush()
+            self.state_manager.flush()
         except Exception:
             pass
         try:
@@ -547,7 +1078,7 @@ class App(ctk.CTk):
 
     def _reschedule_rotation(self):
         self._cancel_rotation()
-        if self.rotation_enabled:
+        if self.rotation_enabled and not self.idle:
             interval_ms = max(1, int(self.rotation_interval)) * 60 * 1000
             self._rotation_after_id = self.after(interval_ms, self._rotate)
 
@@ -555,40 +1086,153 @@ class App(ctk.CTk):
         self._rotation_after_id = None
         if (self.rotation_enabled and not self.overlay_active
                 and self.image_manager is not None and not self.image_manager.is_generating):
-            records = self.image_manager.get_all_records()
-            if len(records) >= 2:
-                next_uuid = self._pick_next_image(records)
+            if len(self.rotation) >= 2 and not self.rotation_schedule.is_quiet():
+                next_uuid = self.rotation.next(self.image_uuid, style=self.rotation_schedule.style_at())
                 if next_uuid:
                     self.set_image(next_uuid)
         self._reschedule_rotation()
 
-    def _pick_next_image(self, records):
-        uuids = [r.uuid for r in records]
-        if self.rotation_mode == "shuffle":
-            candidates = [u for u in uuids if u != self.image_uuid] or uuids
-            return random.choice(candidates)
-        ordered = list(reversed(uuids)) if self.rotation_mode == "newest" else uuids
-        if self.image_uuid in ordered:
-            idx = ordered.index(self.image_uuid)
-            return ordered[(idx + 1) % len(ordered)]
-        return ordered[0]
+    # ---- idle / power saving ----
+    def _note_interaction(self, event=None):
+        self._last_interaction = time.monotonic()
+
+    def _arm_idle_check(self, delay_ms):
+        if self._idle_check_after_id is not None:
+            self.after_cancel(self._idle_check_after_id)
+        self._idle_check_after_id = self.after(delay_ms, self._check_idle)
+
+    def _check_idle(self):
+        self._idle_check_after_id = None
+        quiet = self.rotation_schedule.is_quiet()
+        if self.idle:
+            # No polling while idle: a tap wakes the frame, and quiet hours
+            # end on the hour, so only then is it worth looking again.
+            if self._idle_reason == "quiet":
+                if not quiet:
+                    self.wake()
+                else:
+                    now = datetime.datetime.now()
+                    next_hour = (now + datetime.timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
+                    self._arm_idle_check(int((next_hour - now).total_seconds() * 1000) + 1000)
+            return
+        if not (self.overlay_active or (self.voice_control is not None and self.voice_control.modal)
+                  or (self.image_manager is not None and self.image_manager.is_generating)):
+            inactive = time.monotonic() - self._last_interaction
+            if quiet and inactive >= QUIET_REIDLE_SECONDS:
+                self.enter_idle("quiet")
+            elif self.idle_minutes and inactive >= self.idle_minutes * 60:
+                self.enter_idle("inactive")
+        self._arm_idle_check(IDLE_CHECK_MS)
+
+    def enter_idle(self, reason):
+        """Power-saving mode for an unattended frame.
+
+        Rotation stops, the cross-thread UI queue stops polling (it wakes when
+        work is queued), the idle check only runs again at the end of quiet
+        hours, the display cache is released and, if configured, the canvas
+        goes black. The voice worker already blocks without polling. The upload
+        server keeps listening so a phone can still reach the frame. A tap (or
+        the end of quiet hours) calls wake().
+        """
+        if self.idle:
+            return
+        self.idle = True
+        self._idle_reason = reason
+        self._cancel_rotation()
+        self._ui_drain_ms = IDLE_UI_DRAIN_MS
+        # Idle is the likeliest state before a power-off; keep the boot
+        # snapshot current, then let go of the image like the cache below.
+        self._save_snapshot(background=True)
+        self._shown_image = None
+        if self.idle_blank:
+            self.picture_image_buffer = ImageTk.PhotoImage(Image.new("RGB", (self.width, self.image_height), (0, 0, 0)))
+            self.canvas.itemconfig(self.picture_buffer, image=self.picture_image_buffer)
+        self.display_cache.clear()
+        gc.collect()
+        self._idle_since = (time.monotonic(), time.process_time())
+        logger.info(f"Entering idle mode ({reason}); RSS {process_rss_bytes() / 1e6:.0f} MB")
+
+    def wake(self, repaint=True):
+        """Leave idle mode. Pass repaint=False when the caller is about to
+        show another image anyway, so a blanked frame isn't decoded twice."""
+        if not self.idle:
+            return
+        self.idle = False
+        self._note_interaction()
+        self._ui_drain_ms = UI_DRAIN_MS
+        if self._ui_sleeping:
+            self._on_ui_wake()
+        self._arm_idle_check(IDLE_CHECK_MS)
+        if repaint and self.idle_blank and self.image_uuid:
+            self.set_image(self.image_uuid)
+        self._reschedule_rotation()
+
+        wall_start, cpu_start = self._idle_since
+        wall = time.monotonic() - wall_start
+        cpu = time.process_time() - cpu_start
+        logger.info(
+            f"Leaving idle mode after {wall / 60:.1f} min: {cpu:.2f} s CPU "
+            f"({100 * cpu / max(wall, 1e-6):.2f}%), RSS {process_rss_bytes() / 1e6:.0f} MB"
+        )
 
     def exit(self):
         self._cancel_rotation()
-        self.voice_control.stop()
+        if self.update_checker is not None:
+            self.update_checker.stop()
+        if self.voice_control is not None:
+            self.voice_control.stop()
+        self._stop_upload_server()
+        imaging.shutdown_service()
+        self._save_snapshot()
+        if self.config_manager is not None:
+            self.config_manager.flush()
+        if self.state_manager is not None:
+            self.state_manager.flush()
         self.destroy()
 
     def button_command_newimage(self):
         self.hide_menu()
-        if not self.voice_control.available:
+        if not self._get_voice_control().available:
             self.show_listen_status()
             self.update_listen_status("Microphone not available.")
             self.after(2500, self._dismiss_status_overlay)
             return
         self.show_style_picker()
 
+    def _get_voice_control(self):
+        """The VoiceManager, created on first use. Importing speech_recognition
+        and PyAudio and probing the audio devices is slow, and nothing needs
+        them until NEW is tapped."""
+        if self.voice_control is None:
+            from managers.voice_manager import VoiceManager
+
+            self.voice_control = VoiceManager()
+            self.voice_control.adopt_energy_threshold(self._handoff_threshold)
+            self.voice_control.register_trigger_phrases(
+                ["generate"], self.voice_callback_newimage,
+                wait_start_callback=lambda: self.run_on_ui(self.show_listen_progressbar),
+                wait_end_callback=lambda: self.run_on_ui(self.hide_listen_progressbar),
+                modal=True
+            )
+            self.voice_control.start()
+        return self.voice_control
+
     # ---- style picker (NEW -> choose a style) ----
+    def _build_style_widgets(self):
+        # A borderless 3x3 grid of tiles (Plain in the center) that fills its
+        # container edge-to-edge, with a full-width cancel bar flush beneath it.
+        for sid in STYLE_ORDER:
+            color = STYLE_TILE_COLORS.get(sid, "#b3b3b3")
+            tile = StyleTile(
+                self, STYLE_PRESETS[sid]["label"], color,
+                command=lambda s=sid: self._on_style_selected(s),
+            )
+            self.style_tiles.append(tile)
+        self.style_cancel_button = BlockButton(self, "cancel", "#ff5447", theme.FONT_SIZE_BODY, command=self.hide_style_picker)
+
     def show_style_picker(self):
+        if self.style_cancel_button is None:
+            self._build_style_widgets()
         # Borderless, gapless: 3x3 tiles fill the grid block, cancel spans its
         # full width directly beneath. Anchored on relx=0.5 (like the menu) so it
         # stays centered even when the window is wider than self.width.
@@ -621,25 +1265,64 @@ class App(ctk.CTk):
         self.voice_control.trigger("generate")
 
     def voice_callback_newimage(self, speech, mic, rec):
+        # Every stage of the job is timed into this trace (see timing.py); the
+        # breakdown lands on the record and in logs/timings.jsonl.
+        trace = timing.Trace("new", style=self._pending_style)
+        try:
+            with timing.activate(trace):
+                self._new_image(mic, rec, trace)
+        except Exception as e:
+            trace.finish("error", error=str(e))
+            raise
+
+    def _new_image(self, mic, rec, trace):
         # Runs on the voice manager's background thread. Tk is NOT thread-safe
         # (touching it off the main thread crashes X11 on Linux), so every UI
         # call is marshaled onto the main thread via run_on_ui. The blocking
         # work (listen, prompt, generate) stays here, off the main loop.
+        from managers.voice_manager import standard_listen, standard_recognize, transcribe_audio
+
         self.run_on_ui(self.show_listen_status)
 
         def _status_callback(msg):
             logger.info(msg)
             self.run_on_ui(lambda m=msg: self.update_listen_status(m))
 
-        speech = standard_recognize(
-            mic, rec, timeout=45,
-            start_callback=lambda: self.run_on_ui(self.show_listen_progressbar),
-            end_callback=lambda: self.run_on_ui(self.hide_listen_progressbar),
-        )
+        style = self._pending_style
+        start_callback = lambda: self.run_on_ui(self.show_listen_progressbar)
+        end_callback = lambda: self.run_on_ui(self.hide_listen_progressbar)
+        calibrate = self.voice_control.next_calibration_seconds()
+
+        # Single-pass mode hands the clip straight to an audio-capable chat
+        # model, which returns the transcript and the rewritten prompt together.
+        rewritten_prompt = None
+        if self.enable_chatgpt and self.single_pass_prompt:
+            speech = None
+            audio = standard_listen(mic, rec, timeout=45, start_callback=start_callback,
+                                    end_callback=end_callback, calibrate_seconds=calibrate)
+            if audio is not None:
+                try:
+                    speech, rewritten_prompt = audio_to_prompt(audio.get_wav_data(), style=style)
+                except Exception as e:
+                    logger.warning(f"Single-pass prompt failed ({e}); falling back to transcription.")
+                    try:
+                        speech = transcribe_audio(audio)
+                    except Exception as e:
+                        logger.warning(f"Transcription failed: {e}")
+                if speech:
+                    speech = speech.lower()
+        else:
+            speech = standard_recognize(
+                mic, rec, timeout=45,
+                start_callback=start_callback,
+                end_callback=end_callback,
+                calibrate_seconds=calibrate,
+            )
 
         if not speech:
             _status_callback("No speech detected. Tap NEW and speak after the tone.")
             self.run_on_ui(lambda: self.after(3000, self._dismiss_status_overlay))
+            trace.finish("no speech")
             return
 
         _status_callback(f"Detected speech: {speech}")
@@ -656,12 +1339,16 @@ class App(ctk.CTk):
             speech = speech.replace("verbose", "").strip(",.?!;:")
             _status_callback(f"Verbose mode: {speech}")
             prompt = speech
+            style = None
         else:
-            style = self._pending_style
             style_label = STYLE_PRESETS.get(style, {}).get("label", "Plain")
+            header = f"Style: {style_label}\nTitle: {title}\nGenerated prompt: "
             try:
-                prompt = speech_to_prompt(speech, style=style)
-                _status_callback(f"Style: {style_label}\nTitle: {title}\nGenerated prompt: {prompt}")
+                prompt = rewritten_prompt or speech_to_prompt(
+                    speech, style=style,
+                    on_text=self._throttled_status(lambda text: header + text),
+                )
+                _status_callback(header + prompt)
             except Exception as e:
                 _status_callback(f"Could not generate prompt: {e}")
                 prompt = speech
@@ -671,18 +1358,27 @@ class App(ctk.CTk):
         # the box (y=165) so it sits below the title/prompt text already shown.
         self.run_on_ui(lambda: self.show_listen_progressbar(y=theme.px(165)))
         try:
-            record = self.image_manager.generate(title, prompt)
+            record = self.image_manager.generate(title, prompt, style=style)
         except Exception as e:
             _status_callback(f"Generation failed: {e}")
             self.run_on_ui(self.hide_listen_progressbar)
             self.run_on_ui(lambda: self.after(3500, self._dismiss_status_overlay))
+            trace.finish("failed", error=str(e))
             return
 
         def _finish():
             self.hide_listen_progressbar()
             self.hide_listen_status()
-            self.set_image(record.uuid)
-            self.history_frame.add_item(record)
+            display_start = time.perf_counter()
+
+            def _shown():
+                trace.add("display", time.perf_counter() - display_start)
+                trace.finish("ok", uuid=record.uuid)
+
+            self.set_image(record.uuid, on_shown=_shown)
+            if self.history_frame is not None:
+                self.history_frame.add_item(record)
+            self.rotation.add(record)
             self.hide_overlay()
 
         self.run_on_ui(_finish)
@@ -691,6 +1387,7 @@ class App(ctk.CTk):
         yoffset = theme.px(50)
         border_offset = theme.px(8)
         self.hide_menu()
+        self.build_panels()
         self.history_frame.place(relx=0.5, y=self.height // 2 - yoffset, anchor=tk.CENTER)
         self.history_close_button.place(relx=0.5, y=self.history_frame_height // 2 + self.height // 2 + border_offset - yoffset, anchor=tk.N, width=self.history_frame_width + border_offset * 2, height=theme.px(60))
     
@@ -703,6 +1400,7 @@ class App(ctk.CTk):
         yoffset = theme.px(50)
         border_offset = theme.px(4)
         self.hide_menu()
+        self.build_panels()
         self.setting_frame.update_setting()
         self.setting_frame.place(relx=0.5, y=self.height // 2 - yoffset, anchor=tk.CENTER)
         self.setting_save_button.place(relx=0.5, y=self.setting_frame_height // 2 + self.height // 2 - yoffset + theme.px(30), anchor=tk.E, width=self.setting_frame_width // 2 + border_offset * 2, height=theme.px(60))
@@ -715,9 +1413,8 @@ class App(ctk.CTk):
         self.show_menu()
 
     def save_setting(self):
+        # Subsystems pick up what changed through their config observers.
         self.setting_frame.save_setting()
-        self.image_manager.update_generator_config(self.config_manager)
-        self.configure_general_configs()
         self.hide_setting_frame()
         self.hide_menu()
         self.hide_overlay()
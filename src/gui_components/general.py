@@ -10,7 +10,7 @@ class BlockButton(tk.Button):
 
         super().__init__(
             master,
-            text=" ".join([c for c in text.upper()]),
+            text=self._spaced(text),
             font=theme.font(fs),
             fg=self.bc, 
             bg=self.fc, 
@@ -25,6 +25,13 @@ class BlockButton(tk.Button):
         self.bind("<Enter>", self._button_enter)
         self.bind("<Leave>", self._button_leave)
 
+    @staticmethod
+    def _spaced(text):
+        return " ".join([c for c in text.upper()])
+
+    def set_text(self, text):
+        self["text"] = self._spaced(text)
+
     def _button_enter(self, e):
         self["background"] = self.bc
         self["foreground"] = self.fc
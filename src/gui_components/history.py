@@ -5,11 +5,16 @@ import customtkinter as ctk
 
 from gui_components.general import BlockButton
 from gui_components import theme
-from utils import fit_image
+
+
+PLACEHOLDER_COLOR = (20, 20, 20)
 
 
 class GalleryItem(ctk.CTkFrame):
-    def __init__(self, master, image_width, image_height, uuid: str, display_text: str, path, display_command, delete_command, **kwargs):
+    """One gallery tile. It starts as a blank placeholder; the picture is
+    fitted off the Tk thread and filled in through set_image()."""
+
+    def __init__(self, master, image_width, image_height, uuid: str, display_text: str, display_command, delete_command, **kwargs):
         super().__init__(master, **kwargs)
         self.image_height_percent = 70
         self.label_wrap_length = 80
@@ -42,12 +47,8 @@ class GalleryItem(ctk.CTkFrame):
             text_color="#fff7e3",
             font=theme.font(theme.FONT_SIZE_CAPTION)
         )
-        try:
-            pil_image = fit_image(Image.open(path), int(image_width), int(image_height), background=(20, 20, 20))
-        except Exception:
-            # Missing/corrupt PNG -> show a blank tile instead of crashing the
-            # whole gallery (and startup) on one bad record.
-            pil_image = Image.new("RGB", (int(image_width), int(image_height)), (20, 20, 20))
+        self.image_size = (image_width, image_height)
+        pil_image = Image.new("RGB", (int(image_width), int(image_height)), PLACEHOLDER_COLOR)
         self.image = ctk.CTkImage(pil_image, size=(image_width, image_height))
 
         self.display_command = display_command
@@ -63,6 +64,10 @@ class GalleryItem(ctk.CTkFrame):
         self.display_button.grid(row=2, column=0, sticky="nsew")
         self.delete_button.grid(row=2, column=1, sticky="nsew")
 
+    def set_image(self, pil_image):
+        self.image = ctk.CTkImage(pil_image, size=self.image_size)
+        self.image_label.configure(image=self.image)
+
     def display(self):
         self.display_command(self.uuid)
 
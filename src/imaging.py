@@ -0,0 +1,433 @@
+"""CPU-heavy image work (decode, resize, fit, encode) on a shared process pool.
+
+Pillow releases the GIL for parts of its work, but decoding, resampling and
+PNG encoding still serialize enough to stall Tk. Everything here runs in a small
+ProcessPoolExecutor sized to the machine's cores, so a Pi 4 can spread it over
+all four. Results cross the process boundary as compact raw buffers
+(mode, size, bytes) and are rebuilt with Image.frombytes.
+
+Use the shared instance from get_service(). If a pool can't be started (e.g.
+it fails to spawn, or this is a daemonic child process, which may not have
+children) the work runs inline instead, so callers never need a fallback of
+their own.
+"""
+
+import collections
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+import threading
+import typing
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Uploads are stored no larger than this (longest edge fits the box).
+MAX_UPLOAD_SIZE = (2048, 2048)
+# Cap on pixels actually decoded into RAM, so a decompression-bomb upload can't
+# OOM the Pi. JPEGs are DCT-scaled on decode (see decode_upload), so only the
+# reduced size counts against it.
+MAX_DECODE_PIXELS = 50_000_000
+# Header-level cap: large JPEGs are fine since they never decode at full size.
+# Pillow raises DecompressionBombError past 2x this, which callers catch.
+Image.MAX_IMAGE_PIXELS = 4 * MAX_DECODE_PIXELS
+
+PackedImage = typing.Tuple[str, typing.Tuple[int, int], bytes]
+
+# Resampling tiers for fit_image: "fast" for previews and gallery thumbnails,
+# "final" for the full-screen display.
+QUALITY_FAST = "fast"
+QUALITY_FINAL = "final"
+_RESAMPLE = {QUALITY_FAST: Image.BILINEAR, QUALITY_FINAL: Image.LANCZOS}
+# resize() first box-reduces by an integer factor to within `reducing_gap` x
+# the target, then resamples the rest; a smaller gap is faster, a larger one
+# closer to a pure LANCZOS result.
+_REDUCING_GAP = {QUALITY_FAST: 1.5, QUALITY_FINAL: 3.0}
+
+
+def pack(image: Image.Image) -> PackedImage:
+    return image.mode, image.size, image.tobytes()
+
+
+def unpack(packed: PackedImage) -> Image.Image:
+    mode, size, data = packed
+    return Image.frombytes(mode, size, data)
+
+
+def decode_upload(path: str, max_size=MAX_UPLOAD_SIZE) -> Image.Image:
+    """Decode an uploaded file to an upright RGB(A) image fitting `max_size`.
+
+    JPEGs use draft mode so libjpeg decodes straight at 1/2, 1/4 or 1/8 scale
+    (the smallest that still covers the target), which for phone photos cuts
+    decode memory and time by up to 64x. Every format then goes through
+    thumbnail()'s reducing_gap path (a cheap integer reduce() before the final
+    LANCZOS pass). EXIF orientation is applied last, on the small image.
+    """
+    with Image.open(path) as image:
+        scale = min(max_size[0] / image.width, max_size[1] / image.height, 1.0)
+        target = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+        if image.format == "JPEG":
+            image.draft("RGB", target)
+        if image.width * image.height > MAX_DECODE_PIXELS:
+            raise ValueError(f"image too large to decode ({image.width}x{image.height})")
+        image.thumbnail(max_size, Image.LANCZOS, reducing_gap=2.0)
+        return ImageOps.exif_transpose(image)
+
+
+def fit_image(image, width, height, background=(0, 0, 0), quality=QUALITY_FINAL):
+    """Scale `image` to fit within (width, height) preserving its aspect ratio,
+    centered on a solid `background` (letterbox). Returns an RGB image exactly
+    (width, height) in size, so the source is never stretched/distorted.
+
+    When the aspect already matches (the common case: a 1152x2048 generation on
+    the 9:16 frame) it is a single resize with no canvas allocation or paste.
+    Large downscales use resize()'s reducing_gap, and `quality` picks the
+    resampling tier (QUALITY_FAST / QUALITY_FINAL).
+    """
+    if image.mode == "P" or image.mode == "LA" or (image.mode != "RGBA" and "transparency" in image.info):
+        image = image.convert("RGBA")
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGB")
+
+    src_w, src_h = image.size
+    scale = min(width / src_w, height / src_h)
+    new_w = max(1, round(src_w * scale))
+    new_h = max(1, round(src_h * scale))
+    if (new_w, new_h) != (src_w, src_h):
+        fitted = image.resize((new_w, new_h), _RESAMPLE[quality], reducing_gap=_REDUCING_GAP[quality])
+    else:
+        fitted = image
+
+    if (new_w, new_h) == (width, height) and fitted.mode == "RGB":
+        return fitted
+
+    canvas = Image.new("RGB", (width, height), background)
+    offset = ((width - new_w) // 2, (height - new_h) // 2)
+    if fitted.mode == "RGBA":
+        canvas.paste(fitted, offset, fitted)
+    else:
+        canvas.paste(fitted, offset)
+    return canvas
+
+
+def write_snapshot(path: str, image: Image.Image, tag: str) -> None:
+    """Save `image` as a binary PPM that Tk can show without PIL (see
+    read_snapshot_tag). `tag` (e.g. the record uuid) goes in a header comment."""
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    header = f"P6\n# {tag}\n{image.width} {image.height}\n255\n".encode("ascii")
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(header)
+        f.write(image.tobytes())
+    os.replace(tmp, path)
+
+
+def read_snapshot_tag(path: str) -> typing.Optional[str]:
+    """The tag written by write_snapshot, or None if there is no snapshot."""
+    try:
+        with open(path, "rb") as f:
+            if f.readline().strip() != b"P6":
+                return None
+            comment = f.readline().decode("ascii", "replace").strip()
+    except OSError:
+        return None
+    return comment[1:].strip() if comment.startswith("#") else None
+
+
+# ---- worker functions (module-level so the pool can pickle them) ----
+def _fit_file(path, width, height, background, quality):
+    with Image.open(path) as image:
+        if image.format == "JPEG":
+            image.draft("RGB", (width, height))
+        return pack(fit_image(image, width, height, background=background, quality=quality))
+
+
+def _decode_upload(path, max_size):
+    return pack(decode_upload(path, max_size))
+
+
+def _encode_png(packed, path):
+    # Write beside the target and rename, so readers never see a partial PNG.
+    tmp = path + ".tmp"
+    unpack(packed).save(tmp, "PNG")
+    os.replace(tmp, path)
+
+
+def _render_thumbnail(src_path, dst_path, max_size):
+    with Image.open(src_path) as image:
+        image.thumbnail(max_size, Image.LANCZOS, reducing_gap=2.0)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        tmp = f"{dst_path}.{os.getpid()}.tmp"
+        image.save(tmp, "JPEG", quality=85)
+    os.replace(tmp, dst_path)
+
+
+def _noop():
+    return None
+
+
+class ImagingService:
+    def __init__(self, workers: typing.Optional[int] = None, inline: bool = False) -> None:
+        """`inline` runs all work in this process and never starts a pool."""
+        # One worker per core: the Tk thread mostly waits on these results.
+        self.workers = workers or max(1, os.cpu_count() or 1)
+        self._executor = None
+        self._unavailable = inline
+        self._lock = threading.Lock()
+
+    def _pool(self) -> typing.Optional[concurrent.futures.ProcessPoolExecutor]:
+        with self._lock:
+            if self._executor is None and not self._unavailable:
+                if multiprocessing.current_process().daemon:
+                    # A daemonic process may not have children: the pool would
+                    # start, but every submit() would fail.
+                    logger.info("Running image work inline in daemonic process.")
+                    self._unavailable = True
+                    return None
+                try:
+                    # spawn, not fork: a forked copy of the Tk/X11 process is unsafe.
+                    self._executor = concurrent.futures.ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                    )
+                except Exception as e:
+                    logger.warning(f"Imaging pool unavailable ({e}); running image work inline.")
+                    self._unavailable = True
+            return self._executor
+
+    def _pool_failed(self, pool, error) -> None:
+        """The pool itself (not the work) failed: a worker died, or it was shut
+        down during exit. The caller then runs the work inline."""
+        if isinstance(error, concurrent.futures.process.BrokenProcessPool):
+            logger.warning(f"Imaging pool broke ({error}); restarting it.")
+            with self._lock:
+                if self._executor is pool:
+                    self._executor = None
+        else:
+            logger.debug(f"Imaging pool rejected work ({error!r}); running inline.")
+
+    def _run(self, fn, *args, inline=False):
+        pool = None if inline else self._pool()
+        if pool is not None:
+            try:
+                # Raises BrokenProcessPool, or RuntimeError after shutdown.
+                future = pool.submit(fn, *args)
+            except RuntimeError as e:
+                self._pool_failed(pool, e)
+            else:
+                try:
+                    return future.result()
+                except (concurrent.futures.process.BrokenProcessPool, concurrent.futures.CancelledError) as e:
+                    # Errors raised by fn itself propagate to the caller as-is.
+                    self._pool_failed(pool, e)
+        return fn(*args)
+
+    def _submit(self, on_done, fn, *args) -> None:
+        """Run fn(*args) without waiting for it. `on_done(result, error)` is
+        called from the pool's callback thread, or right away if there is no
+        pool; callers hand it on to their own thread (e.g. App.run_on_ui)."""
+        pool = self._pool()
+        if pool is not None:
+            try:
+                future = pool.submit(fn, *args)
+            except RuntimeError as e:
+                self._pool_failed(pool, e)
+            else:
+                future.add_done_callback(lambda f: self._deliver(f, pool, on_done, fn, args))
+                return
+        self._deliver_inline(on_done, fn, args)
+
+    def _deliver(self, future, pool, on_done, fn, args) -> None:
+        try:
+            result = future.result()
+        except (concurrent.futures.process.BrokenProcessPool, concurrent.futures.CancelledError) as e:
+            self._pool_failed(pool, e)
+            self._deliver_inline(on_done, fn, args)
+            return
+        except Exception as e:
+            on_done(None, e)
+            return
+        on_done(result, None)
+
+    @staticmethod
+    def _deliver_inline(on_done, fn, args) -> None:
+        try:
+            result = fn(*args)
+        except Exception as e:
+            on_done(None, e)
+            return
+        on_done(result, None)
+
+    def warm_up(self) -> None:
+        """Start the worker processes in the background (they take a moment to spawn)."""
+        pool = self._pool()
+        if pool is not None:
+            for _ in range(self.workers):
+                pool.submit(_noop)
+
+    def fit_file(self, path: str, width: int, height: int, background=(0, 0, 0), quality=QUALITY_FINAL,
+                 inline: bool = False) -> Image.Image:
+        """Open `path` and letterbox it to exactly (width, height); see fit_image.
+
+        `inline` does the work in this process, e.g. for the first paint at
+        startup, which shouldn't wait for the pool to spawn.
+        """
+        return unpack(self._run(_fit_file, path, int(width), int(height), tuple(background), quality, inline=inline))
+
+    def fit_file_async(self, path: str, width: int, height: int,
+                       on_done: typing.Callable[[typing.Optional[Image.Image], typing.Optional[Exception]], None],
+                       background=(0, 0, 0), quality=QUALITY_FINAL) -> None:
+        """fit_file without blocking: `on_done(image, error)` gets the result
+        on a pool thread (see _submit)."""
+        def _unpacked(packed, error):
+            on_done(unpack(packed) if error is None else None, error)
+
+        self._submit(_unpacked, _fit_file, path, int(width), int(height), tuple(background), quality)
+
+    def decode_upload(self, path: str, max_size=MAX_UPLOAD_SIZE) -> Image.Image:
+        return unpack(self._run(_decode_upload, path, tuple(max_size)))
+
+    def encode_png(self, image: Image.Image, path: str) -> None:
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGB")
+        self._run(_encode_png, pack(image), path)
+
+    def render_thumbnail(self, src_path: str, dst_path: str, max_size) -> None:
+        self._run(_render_thumbnail, src_path, dst_path, tuple(max_size))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _read_meminfo() -> typing.Dict[str, int]:
+    """/proc/meminfo in bytes (Linux only; empty elsewhere)."""
+    info = {}
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                fields = rest.split()
+                if fields:
+                    info[name] = int(fields[0]) * 1024
+    except (OSError, ValueError):
+        pass
+    return info
+
+
+class DisplayImageCache:
+    """Byte-capped LRU of ready-to-show (already fitted) display images.
+
+    Revisiting a recent image from the gallery or the rotation skips the PNG
+    decode and the fit entirely. The budget is a share of physical RAM, and
+    whenever the system's available memory runs low the cache sheds half of
+    what it holds. Hit/miss counters are logged every LOG_EVERY lookups.
+    """
+
+    DEFAULT_BYTES = 64 * 1024 * 1024  # when RAM size is unknown
+    RAM_FRACTION = 16                 # budget = RAM / 16, clamped below
+    MIN_BYTES = 32 * 1024 * 1024
+    MAX_BYTES = 256 * 1024 * 1024
+    LOW_MEMORY_BYTES = 128 * 1024 * 1024
+    LOG_EVERY = 50
+
+    def __init__(self, max_bytes: typing.Optional[int] = None) -> None:
+        self.max_bytes = max_bytes or self._default_budget()
+        self._images = collections.OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _default_budget(cls) -> int:
+        total = _read_meminfo().get("MemTotal")
+        if not total:
+            return cls.DEFAULT_BYTES
+        return min(cls.MAX_BYTES, max(cls.MIN_BYTES, total // cls.RAM_FRACTION))
+
+    @staticmethod
+    def _image_bytes(image: Image.Image) -> int:
+        return image.width * image.height * len(image.getbands())
+
+    def get(self, key) -> typing.Optional[Image.Image]:
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            if (self.hits + self.misses) % self.LOG_EVERY == 0:
+                logger.info(
+                    f"Display cache: {self.hits} hits / {self.misses} misses, "
+                    f"{len(self._images)} images, {self._bytes / 1e6:.0f}/{self.max_bytes / 1e6:.0f} MB"
+                )
+            return image
+
+    def put(self, key, image: Image.Image) -> None:
+        size = self._image_bytes(image)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._images.pop(key, None)
+            if old is not None:
+                self._bytes -= self._image_bytes(old)
+            self._images[key] = image
+            self._bytes += size
+            limit = self.max_bytes
+            available = _read_meminfo().get("MemAvailable")
+            if available is not None and available < self.LOW_MEMORY_BYTES:
+                limit = self._bytes // 2
+                logger.info(f"Low memory ({available / 1e6:.0f} MB available); shrinking display cache.")
+            self._evict_to(limit)
+
+    def _evict_to(self, limit: int) -> None:
+        while self._images and self._bytes > limit:
+            _, image = self._images.popitem(last=False)
+            self._bytes -= self._image_bytes(image)
+
+    def discard(self, predicate: typing.Callable[[typing.Any], bool]) -> None:
+        """Drop every entry whose key matches `predicate` (e.g. a deleted image)."""
+        with self._lock:
+            for key in [k for k in self._images if predicate(k)]:
+                self._bytes -= self._image_bytes(self._images.pop(key))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._images.clear()
+            self._bytes = 0
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_service() -> ImagingService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ImagingService()
+        return _service
+
+
+def run_inline() -> None:
+    """Make the shared service run all work in this process, e.g. in the upload
+    server's child process, which is already off the Tk process."""
+    global _service
+    with _service_lock:
+        previous, _service = _service, ImagingService(inline=True)
+    if previous is not None:
+        previous.shutdown()
+
+
+def shutdown_service() -> None:
+    with _service_lock:
+        service = _service
+    if service is not None:
+        service.shutdown()
@@ -5,6 +5,7 @@ from logging.handlers import RotatingFileHandler
 
 _LOG_DIR = os.path.join(os.path.dirname(__file__), "..", "logs")
 _LOG_PATH = os.path.join(_LOG_DIR, "app.log")
+_TIMINGS_PATH = os.path.join(_LOG_DIR, "timings.jsonl")
 
 
 def setup_logging(level=logging.INFO):
@@ -40,3 +41,15 @@ def setup_logging(level=logging.INFO):
         root.removeHandler(existing)
     for h in handlers:
         root.addHandler(h)
+
+    # Stage timings (see timing.py): bare JSON lines in their own file.
+    timings = logging.getLogger("timings")
+    timings.propagate = False
+    for existing in list(timings.handlers):
+        timings.removeHandler(existing)
+    try:
+        handler = RotatingFileHandler(_TIMINGS_PATH, maxBytes=1_000_000, backupCount=3)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        timings.addHandler(handler)
+    except OSError as e:
+        print(f"Could not open timings file {_TIMINGS_PATH}: {e}")
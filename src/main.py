@@ -1,10 +1,14 @@
 import argparse
 import logging
 import sys
+import time
+
+# Taken before anything heavy is imported; the reference for the startup timer.
+_PROCESS_START = time.perf_counter()
 
 from logging_config import setup_logging
+import timing
 
-setup_logging()
 logger = logging.getLogger(__name__)
 
 
@@ -27,15 +31,87 @@ def _init_x11_threads():
         logger.warning("Could not call XInitThreads (libX11 not found).")
 
 
-_init_x11_threads()
-
 import os
 
-from gui import App
-from generator import OpenAIImageGenerator
-from managers.image_manager import ImageManager
-from managers.config_manager import ConfigManager
-from managers.upload_manager import UploadServer
+# Only what the first paint needs is imported at module level (the spawned
+# imaging/upload children re-import this module, too, so nothing at module
+# level may have side effects: logging and X11 are set up in main()). qrcode, the voice stack
+# and Flask load on first use or after the first paint.
+_STARTUP_IMPORTS = (
+    "gui", "generator", "imaging",
+    "managers.image_manager", "managers.config_manager", "managers.state_manager",
+)
+IMPORT_REPORT_PATH = os.path.join(os.path.dirname(__file__), "..", "logs", "importtime.log")
+
+
+def import_report(top=20):
+    """Print the slowest imports on the startup path, as measured by
+    `python -X importtime`, and keep the raw output in logs/importtime.log."""
+    import subprocess
+
+    code = "import main; " + "; ".join(f"import {name}" for name in _STARTUP_IMPORTS)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except (ValueError, IndexError):
+            continue  # the header line
+        rows.append((cumulative_us, self_us, fields[2].rstrip()))
+
+    os.makedirs(os.path.dirname(IMPORT_REPORT_PATH), exist_ok=True)
+    with open(IMPORT_REPORT_PATH, "w") as f:
+        f.write(result.stderr)
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {name}")
+    print(f"Full -X importtime output: {os.path.abspath(IMPORT_REPORT_PATH)}")
+    if result.returncode != 0:
+        print(f"Import failed, report is partial: {result.stderr.strip().splitlines()[-1]}")
+
+
+def start_upload_server(app, args, image_manager, imgs_folder, upload_titles=None):
+    """Web upload server: a phone/browser on the same Wi-Fi can push images
+    straight to the frame's gallery. Started after the first paint.
+
+    Uploads still spooled from the previous run are resumed; `upload_titles`
+    (from the handoff) restores their titles.
+    """
+    from managers.upload_manager import UploadServer, UploadServerProcess
+
+    spool_dir = os.path.join(imgs_folder, "spool")
+    if args.upload_process:
+        # Decoding/encoding in the child keeps uploads from stalling the UI.
+        upload_server = UploadServerProcess(
+            imgs_folder, on_record=app.handle_uploaded_record, port=8080,
+            spool_dir=spool_dir,
+            on_batch_end=app.handle_upload_batch_end,
+            on_display=app.handle_api_display,
+            on_delete=app.handle_api_delete,
+            on_update=app.handle_api_update,
+        )
+    else:
+        upload_server = UploadServer(
+            on_image=app.handle_uploaded_image, port=8080,
+            spool_dir=spool_dir,
+            on_batch_end=app.handle_upload_batch_end,
+            image_manager=image_manager,
+            on_display=app.handle_api_display,
+            on_delete=app.handle_api_delete,
+            on_update=app.handle_api_update,
+        )
+    upload_server.start()
+    if not args.upload_process:
+        # The child process resumes its spool itself.
+        upload_server.resume_spooled(upload_titles)
+    app.set_upload_server(upload_server)
 
 
 def main():
@@ -44,20 +120,70 @@ def main():
         "--windowed", action="store_true",
         help="Run in a scaled-down 540x960 window (for PC debugging) instead of fullscreen.",
     )
+    parser.add_argument(
+        "--upload-process", action="store_true",
+        help="Run the web upload server in a separate process instead of a thread.",
+    )
+    parser.add_argument(
+        "--import-report", action="store_true",
+        help="Print the slowest imports on the startup path (python -X importtime) and exit.",
+    )
     args, _ = parser.parse_known_args()
 
-    image_manager = ImageManager(os.path.join(os.path.dirname(__file__), '..', 'imgs'), OpenAIImageGenerator())
-    config_manager = ConfigManager()
-
-    app = App(windowed=args.windowed)
-    app.set_managers(image_manager, config_manager)
-
-    # Web upload server: a phone/browser on the same Wi-Fi can push images
-    # straight to the frame's gallery.
-    upload_server = UploadServer(on_image=app.handle_uploaded_image, port=8080)
-    upload_server.start()
-    app.set_upload_server(upload_server)
-
+    setup_logging()
+    _init_x11_threads()
+
+    if args.import_report:
+        import_report()
+        return
+
+    timer = timing.Trace("startup", start=_PROCESS_START)
+    import imaging
+    from gui import App
+    timer.mark("imports")
+
+    # The last frame goes up before the managers load (see App._paint_snapshot).
+    imgs_folder = os.path.join(os.path.dirname(__file__), '..', 'imgs')
+    app = App(windowed=args.windowed, snapshot_dir=imgs_folder)
+    app.update()
+    timer.mark("snapshot")
+
+    from generator import OpenAIImageGenerator
+    from managers.image_manager import ImageManager
+    from managers.config_manager import ConfigManager
+    from managers.state_manager import StateManager
+    from managers import sync_manager
+    from prompt import STYLE_ORDER
+    # Warm state from the process that restarted into this one (after SYNC).
+    handoff = sync_manager.take_handoff()
+    image_manager = ImageManager(imgs_folder, OpenAIImageGenerator())
+    config_manager = ConfigManager(style_names=STYLE_ORDER)
+    state_manager = StateManager()
+    # current_image used to live in configs.json; carry it over once.
+    if config_manager.legacy_values.get("current_image"):
+        state_manager.setdefault("current_image", config_manager.legacy_values["current_image"])
+    timer.mark("managers")
+
+    app.set_managers(image_manager, config_manager, state_manager)
+    app.update()
+    timer.mark("first paint")
+
+    def _after_first_paint():
+        # Spawn the imaging workers; they are up by the time the next image
+        # needs fitting.
+        imaging.get_service().warm_up()
+        app.adopt_handoff(handoff)
+        app.build_panels()
+        timer.mark("panels")
+        try:
+            start_upload_server(app, args, image_manager, imgs_folder, handoff.get("upload_jobs"))
+        except Exception as e:
+            logger.exception(f"Upload server failed to start: {e}")
+        timer.mark("upload server")
+        app.start_update_checks()
+        timer.finish()
+
+    app.after_idle(_after_first_paint)
     app.mainloop()
 
 
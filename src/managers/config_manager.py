@@ -1,8 +1,10 @@
+import contextlib
 import copy
 import dataclasses
 import json
 import logging
 import os
+import threading
 import typing
 
 logger = logging.getLogger(__name__)
@@ -33,12 +35,42 @@ def deserialize_config_group(config_group_dict: dict) -> ConfigGroup:
 
 
 class ConfigManager:
-    def __init__(self, reinitialize=False) -> None:
+    # Debounced writes (set_config_value(..., debounce=True)) are coalesced and
+    # flushed this many seconds after the last change.
+    SAVE_DEBOUNCE_SECONDS = 2.0
+
+    def __init__(self, reinitialize=False, style_names: typing.Sequence[str] = ()) -> None:
+        """`style_names` are the prompt styles offered for the rotation
+        schedule (see prompt.STYLE_ORDER)."""
         self.configs_path = os.path.join(os.path.dirname(__file__), "..", "..", "configs.json")
+
+        # Settings are saved from the Tk thread while debounced flushes fire on
+        # a timer thread, so in-memory state and file writes share one lock.
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._dirty = False
+        self._save_timer = None
+        # Per-key change observers: [(keys, callback)], plus the changes made
+        # since the last publish (held back while a batch is open).
+        self._observers = []
+        self._pending_changes = {}
+
         self.configs = self._read_configs()
+        self._reindex()
+        # Values of stored items the current schema no longer defines, so a
+        # caller can migrate them elsewhere (e.g. current_image -> StateManager).
+        self.legacy_values = {}
+        self.style_names = list(style_names)
 
         self.initialize_configs(overwrite=reinitialize)
 
+    def _reindex(self) -> None:
+        """Rebuild the name -> location index; call whenever self.configs is replaced."""
+        self._index = {}
+        for i, config_group in enumerate(self.configs):
+            for j, config_item in enumerate(config_group.items):
+                self._index[config_item.name] = (i, j)
+
     def _read_configs(self) -> typing.List[ConfigGroup]:
         if not os.path.exists(self.configs_path):
             return []
@@ -52,10 +84,95 @@ class ConfigManager:
 
     def _save_configs(self) -> None:
         # Atomic write so a crash mid-save can't corrupt the config.
-        tmp = self.configs_path + ".tmp"
-        with open(tmp, 'w') as f:
-            json.dump([serialize_config_group(g) for g in self.configs], f, indent=2)
-        os.replace(tmp, self.configs_path)
+        with self._lock:
+            self._cancel_save_timer()
+            self._dirty = False
+            tmp = self.configs_path + ".tmp"
+            with open(tmp, 'w') as f:
+                json.dump([serialize_config_group(g) for g in self.configs], f, indent=2)
+            os.replace(tmp, self.configs_path)
+
+    def _cancel_save_timer(self) -> None:
+        if self._save_timer is not None:
+            self._save_timer.cancel()
+            self._save_timer = None
+
+    def _request_save(self, debounce: bool = False) -> None:
+        """Persist a change now, at the end of the enclosing batch, or (debounced)
+        shortly after the last of a burst of changes."""
+        with self._lock:
+            self._dirty = True
+            if self._batch_depth > 0:
+                return
+            if not debounce:
+                self._save_configs()
+                return
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.SAVE_DEBOUNCE_SECONDS, self._debounced_save)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def _debounced_save(self) -> None:
+        with self._lock:
+            self._save_timer = None
+            # Inside a batch the batch's exit does the write.
+            if self._dirty and self._batch_depth == 0:
+                try:
+                    self._save_configs()
+                except OSError as e:
+                    logger.error(f"Could not save configs.json: {e}")
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Group several set_config_value calls into a single configs.json write.
+
+            with config_manager.batch():
+                config_manager.set_config_value("quality", "high")
+                config_manager.set_config_value("rotation_interval", 5)
+
+        Batches nest; the write happens when the outermost one exits, and only
+        if something actually changed.
+        """
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if self._batch_depth == 0 and self._dirty:
+                    self._save_configs()
+            self._publish_changes()
+
+    def subscribe(self, keys: typing.Iterable[str], callback: typing.Callable[[typing.Dict[str, typing.Any]], None]) -> None:
+        """Call `callback({name: new_value})` whenever any of `keys` actually changes.
+
+        A callback only sees its own keys, once per set_config_value or once per
+        batch, and runs on the thread that made the change.
+        """
+        with self._lock:
+            self._observers.append((frozenset(keys), callback))
+
+    def _publish_changes(self) -> None:
+        with self._lock:
+            if self._batch_depth > 0 or not self._pending_changes:
+                return
+            changes, self._pending_changes = self._pending_changes, {}
+            observers = list(self._observers)
+
+        for keys, callback in observers:
+            relevant = {name: value for name, value in changes.items() if name in keys}
+            if relevant:
+                try:
+                    callback(relevant)
+                except Exception as e:
+                    logger.exception(f"Config observer failed for {sorted(relevant)}: {e}")
+
+    def flush(self) -> None:
+        """Write any pending debounced change immediately (e.g. on exit)."""
+        with self._lock:
+            if self._dirty and self._batch_depth == 0:
+                self._save_configs()
 
     @staticmethod
     def _value_compatible(item: ConfigItem, old_value: typing.Any, old_type: str) -> bool:
@@ -78,6 +195,7 @@ class ConfigManager:
         """
         if overwrite or (not os.path.exists(self.configs_path)):
             self.configs = copy.deepcopy(code_configs)
+            self._reindex()
             self._save_configs()
             return
 
@@ -87,6 +205,10 @@ class ConfigManager:
                 existing[item.name] = (item.value, item.type)
 
         reconciled = copy.deepcopy(code_configs)
+        schema_names = {item.name for group in reconciled for item in group.items}
+        self.legacy_values = {
+            name: value for name, (value, _) in existing.items() if name not in schema_names
+        }
         for group in reconciled:
             for item in group.items:
                 if item.name in existing:
@@ -97,16 +219,18 @@ class ConfigManager:
                         item.value = old_value
 
         self.configs = reconciled
+        self._reindex()
         self._save_configs()
 
     def initialize_configs(self, overwrite=False) -> None:
+        styles = ["any"] + self.style_names
         config_group_general = ConfigGroup(
             name="general_configs",
             label="General Settings",
             items=[
-                ConfigItem("current_image", "Current Image", "str", "", None, editable=False),
                 ConfigItem("do_resize", "Resize to Fit", "bool", True, None),
                 ConfigItem("enable_chatgpt", "Enable ChatGPT Prompt", "bool", True, None),
+                ConfigItem("single_pass_prompt", "Single-Pass Voice", "bool", False, None),
             ]
         )
 
@@ -142,9 +266,29 @@ class ConfigManager:
                         "sequential",
                         "shuffle",
                         "newest",
+                        "weighted",
                     ]
                 ),
                 ConfigItem("rotation_interval", "Interval (min)", "int", 10, (1, 240, 1)),
+                # Quiet hours: no rotation from start until end (equal = off).
+                ConfigItem("quiet_start", "Quiet From (h)", "int", 0, (0, 23, 1)),
+                ConfigItem("quiet_end", "Quiet Until (h)", "int", 0, (0, 23, 1)),
+                # Weighted mode: only show images of this style during the day part.
+                ConfigItem("morning_style", "Morning Style", "str", "any", styles),
+                ConfigItem("afternoon_style", "Afternoon Style", "str", "any", styles),
+                ConfigItem("evening_style", "Evening Style", "str", "any", styles),
+                ConfigItem("night_style", "Night Style", "str", "any", styles),
+            ]
+        )
+
+        config_group_power = ConfigGroup(
+            name="power_configs",
+            label="Power",
+            items=[
+                # Idle mode after this many minutes without a tap (0 = never);
+                # quiet hours (see Rotation) always idle the frame.
+                ConfigItem("idle_minutes", "Idle After (min)", "int", 0, (0, 240, 5)),
+                ConfigItem("idle_blank", "Blank When Idle", "bool", False, None),
             ]
         )
 
@@ -152,6 +296,7 @@ class ConfigManager:
             config_group_general,
             config_group_gpt_image,
             config_group_rotation,
+            config_group_power,
         ]
 
         self._initialize_configs(configs, overwrite=overwrite)
@@ -163,13 +308,9 @@ class ConfigManager:
         return -1
 
     def find_config_item_index(self, item_name: str) -> typing.Tuple[int, int]:
-        for i, config_group in enumerate(self.configs):
-            for j, config_item in enumerate(config_group.items):
-                if config_item.name == item_name:
-                    return i, j
-        return -1, -1
+        return self._index.get(item_name, (-1, -1))
 
-    def _modify_config_item(self, item_name: str, value: typing.Any) -> None:
+    def _modify_config_item(self, item_name: str, value: typing.Any, debounce: bool = False) -> None:
         group_index, item_index = self.find_config_item_index(item_name)
 
         if group_index == -1 or item_index == -1:
@@ -181,15 +322,20 @@ class ConfigManager:
             if not (value_type == "int" and target_type == "float"):
                 raise ValueError(f"Config item {item_name} has type {target_type}, but value has type {value_type}")
 
-        if self.configs[group_index].items[item_index].value != value:
-            self.configs[group_index].items[item_index].value = value
-            self._save_configs()
+        with self._lock:
+            if self.configs[group_index].items[item_index].value != value:
+                self.configs[group_index].items[item_index].value = value
+                self._pending_changes[item_name] = value
+                self._request_save(debounce=debounce)
 
-    def set_config_value(self, item_name: str, value: typing.Any) -> None:
+    def set_config_value(self, item_name: str, value: typing.Any, debounce: bool = False) -> None:
+        """Set a value and persist it. `debounce=True` is for high-frequency keys:
+        the write is deferred and coalesced with other changes (see flush())."""
         try:
-            self._modify_config_item(item_name, value)
+            self._modify_config_item(item_name, value, debounce=debounce)
         except ValueError as e:
             logger.warning(f"Error modifying config item {item_name}: {e}. Leaving unchanged.")
+        self._publish_changes()
 
     def get_all_configs(self) -> typing.List[ConfigGroup]:
         return self.configs
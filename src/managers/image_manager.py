@@ -1,3 +1,4 @@
+import contextlib
 import dataclasses
 import datetime
 import json
@@ -9,6 +10,13 @@ import typing
 
 from PIL import Image
 
+try:
+    import fcntl
+except ImportError:  # Windows (PC debugging): in-process locking only
+    fcntl = None
+
+import imaging
+import timing
 from generator import ImageGenerator, OpenAIImageGenerator
 from managers.config_manager import ConfigManager
 from utils import date_serializer, date_deserializer
@@ -23,62 +31,137 @@ class ImageRecord:
     title: typing.Optional[str] = None
     date: typing.Optional[datetime.date] = None
     model: typing.Optional[str] = None
+    # Style preset the prompt was written in (see prompt.STYLE_PRESETS); None
+    # for uploads and verbose prompts. Used by the rotation schedule.
+    style: typing.Optional[str] = None
+    favorite: bool = False
+    # Seconds per pipeline stage for generated images, e.g. {"listen": 5.2,
+    # "generate": 31.0, ...} (see timing.py); None for uploads.
+    timings: typing.Optional[typing.Dict[str, float]] = None
 
 class ImageManager:
+    # On-disk thumbnail renditions (for the web gallery API), JPEG in thumbs/.
+    THUMBNAIL_SIZE = (360, 640)
+
     def __init__(self, folder: str, generator: typing.Optional[ImageGenerator]=None):
         self.folder = folder
         self.generator = generator
 
         self.records_path = os.path.join(self.folder, "records.json")
+        self.thumbnail_folder = os.path.join(self.folder, "thumbs")
 
         self.is_generating = False
         # Generation (voice thread) and uploads (web-server thread) can both
         # append records, so the read-modify-write of records.json is guarded.
         self._records_lock = threading.RLock()
+        # The upload server may also run in a child process (see
+        # UploadServerProcess); writers then additionally take a file lock.
+        self._records_lock_path = os.path.join(self.folder, "records.lock")
+        # Parsed records.json, reused while the file's (mtime, size) is unchanged;
+        # another process writing it simply invalidates the cache.
+        self._records_cache = None
+        # uuids whose thumbnail rendition is known to be current.
+        self._known_thumbnails = set()
 
     def uuid_to_path(self, uuid: str) -> str:
         return os.path.join(self.folder, f"{uuid}.png")
 
+    def uuid_to_thumbnail_path(self, uuid: str) -> str:
+        return os.path.join(self.thumbnail_folder, f"{uuid}.jpg")
+
+    def ensure_thumbnail(self, uuid: str) -> typing.Optional[str]:
+        """Path of the record's thumbnail rendition, rendering it on first use.
+
+        Returns None if the source image is missing. Rendered renditions are
+        reused until the source PNG is newer.
+        """
+        image_path = self.uuid_to_path(uuid)
+        thumb_path = self.uuid_to_thumbnail_path(uuid)
+        if uuid in self._known_thumbnails:
+            return thumb_path
+        if not os.path.exists(image_path):
+            return None
+        if os.path.exists(thumb_path) and os.path.getmtime(thumb_path) >= os.path.getmtime(image_path):
+            self._known_thumbnails.add(uuid)
+            return thumb_path
+
+        os.makedirs(self.thumbnail_folder, exist_ok=True)
+        # Concurrent requests may render the same thumbnail; the atomic replace
+        # in the worker makes that harmless.
+        imaging.get_service().render_thumbnail(image_path, thumb_path, self.THUMBNAIL_SIZE)
+        self._known_thumbnails.add(uuid)
+        return thumb_path
+
+    def _records_stat(self) -> typing.Tuple[int, int]:
+        st = os.stat(self.records_path)
+        return st.st_mtime_ns, st.st_size
+
     def _read_records(self) -> typing.List[ImageRecord]:
+        """Record dicts from records.json. The list may be the cached one, so
+        callers must hold the records lock and only mutate it right before
+        _save_records."""
         if not os.path.exists(self.records_path):
             return []
         try:
+            key = self._records_stat()
+            if self._records_cache is not None and self._records_cache[0] == key:
+                return self._records_cache[1]
             with open(self.records_path, 'r') as f:
-                return json.load(f, object_hook=date_deserializer)
+                records = json.load(f, object_hook=date_deserializer)
         except (json.JSONDecodeError, OSError) as e:
             logger.error(f"records.json unreadable ({e}); starting with no history")
             return []
+        self._records_cache = (key, records)
+        return records
 
     def _save_records(self, records: typing.List[ImageRecord]) -> None:
         # Write atomically so a crash/power-loss mid-write can't truncate the
         # file and brick the gallery on next start.
+        self._records_cache = None
         tmp = self.records_path + ".tmp"
         with open(tmp, 'w') as f:
             json.dump(records, f, indent=2, default=date_serializer)
         os.replace(tmp, self.records_path)
+        self._records_cache = (self._records_stat(), records)
 
-    def _store_image(self, image: Image.Image, title: str, prompt: str, model: str) -> ImageRecord:
+    @contextlib.contextmanager
+    def _records_write_lock(self):
+        """Exclusive access for a read-modify-write of records.json, across
+        threads and (where flock exists) across processes."""
+        with self._records_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._records_lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _store_image(self, image: Image.Image, title: str, prompt: str, model: str,
+                     style: typing.Optional[str] = None) -> ImageRecord:
         """Persist a PIL image as a PNG on disk and append its record. Thread-safe.
 
         Images are always stored as PNG regardless of how they were produced, so
         `uuid_to_path` and every consumer can assume a single on-disk format.
         """
-        if image.mode not in ("RGB", "RGBA"):
-            image = image.convert("RGB")
-
         image_uuid = str(uuid.uuid4())
         image_path = self.uuid_to_path(image_uuid)
-        image.save(image_path, "PNG")
+        # PNG encoding is CPU-heavy; do it on the imaging pool.
+        with timing.span("encode"):
+            imaging.get_service().encode_png(image, image_path)
 
-        record = ImageRecord(image_uuid, prompt, title, datetime.date.today(), model)
-        with self._records_lock:
+        record = ImageRecord(image_uuid, prompt, title, datetime.date.today(), model, style,
+                             timings=timing.stages())
+        with timing.span("index"), self._records_write_lock():
             records = self._read_records()
             records.append(dataclasses.asdict(record))
             self._save_records(records)
 
         return record
 
-    def generate(self, title: str, prompt: str) -> ImageRecord:
+    def generate(self, title: str, prompt: str, style: typing.Optional[str] = None) -> ImageRecord:
         if self.generator is None:
             raise ValueError("No generator provided for image manager.")
 
@@ -88,7 +171,7 @@ class ImageManager:
         finally:
             self.is_generating = False
 
-        return self._store_image(image, title, prompt, self.generator.get_model())
+        return self._store_image(image, title, prompt, self.generator.get_model(), style)
 
     def save_uploaded_image(self, image: Image.Image, title: str) -> ImageRecord:
         """Ingest a user-uploaded image as a new gallery entry."""
@@ -100,14 +183,35 @@ class ImageManager:
         return [ImageRecord(**record) for record in records]
 
     def delete_record(self, target_uuid) -> None:
-        with self._records_lock:
+        with self._records_write_lock():
             records = self._read_records()
             records = [record for record in records if record["uuid"] != target_uuid]
             self._save_records(records)
 
-        image_path = self.uuid_to_path(str(target_uuid))
-        if os.path.exists(image_path):
-            os.remove(image_path)
+        self._known_thumbnails.discard(str(target_uuid))
+        for path in (self.uuid_to_path(str(target_uuid)), self.uuid_to_thumbnail_path(str(target_uuid))):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def set_favorite(self, target_uuid: str, favorite: bool) -> typing.Optional[ImageRecord]:
+        """Mark or unmark a record as a favorite; returns the updated record."""
+        with self._records_write_lock():
+            records = self._read_records()
+            for record in records:
+                if record["uuid"] == target_uuid:
+                    record["favorite"] = bool(favorite)
+                    self._save_records(records)
+                    return ImageRecord(**record)
+        return None
+
+    def get_records_page(self, offset: int, limit: int, newest_first: bool = True) -> typing.Tuple[typing.List[ImageRecord], int]:
+        """A slice of the history plus the total record count."""
+        with self._records_lock:
+            records = self._read_records()
+        if newest_first:
+            records = records[::-1]
+        page = records[max(0, offset):max(0, offset) + max(0, limit)]
+        return [ImageRecord(**record) for record in page], len(records)
 
     def get_last_record(self) -> ImageRecord:
         with self._records_lock:
@@ -121,6 +225,12 @@ class ImageManager:
         with self._records_lock:
             return len(self._read_records())
 
+    def generator_config_keys(self) -> typing.List[str]:
+        """Config item names the generator reads (see ImageGenerator.configure)."""
+        if self.generator is None:
+            return []
+        return list(self.generator.configs.keys())
+
     def update_generator_config(self, config_manager: ConfigManager) -> None:
         if self.generator is None:
             raise ValueError("No generator provided for image manager.")
@@ -0,0 +1,111 @@
+import json
+import logging
+import os
+import threading
+import typing
+
+logger = logging.getLogger(__name__)
+
+
+class StateManager:
+    """Volatile runtime state (current image, rotation cursor, ...).
+
+    Kept apart from the user-facing configs.json because it changes on every
+    rotation tick. Values live in memory and are written behind: a change marks
+    the store dirty and a timer writes state.json at most once per
+    FLUSH_INTERVAL_SECONDS, plus on flush() at exit/restart. A power cut can
+    lose at most that window, which for a slideshow cursor is harmless.
+    """
+
+    FLUSH_INTERVAL_SECONDS = 300
+
+    def __init__(self, state_path: typing.Optional[str] = None) -> None:
+        self.state_path = state_path or os.path.join(os.path.dirname(__file__), "..", "..", "state.json")
+
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._flush_timer = None
+        self._state = self._read_state()
+        # key -> getter for values read only when state.json is written.
+        self._bound = {}
+
+    def _read_state(self) -> dict:
+        if not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, 'r') as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else {}
+        except (json.JSONDecodeError, OSError) as e:
+            logger.error(f"state.json unreadable ({e}); starting with empty state")
+            return {}
+
+    def _save_state(self) -> None:
+        for key, getter in self._bound.items():
+            self._state[key] = getter()
+        # Atomic write, like configs.json / records.json.
+        tmp = self.state_path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self._state, f, indent=2)
+        os.replace(tmp, self.state_path)
+
+    def get(self, key: str, default: typing.Any = None) -> typing.Any:
+        with self._lock:
+            if key in self._bound:
+                return self._bound[key]()
+            return self._state.get(key, default)
+
+    def set(self, key: str, value: typing.Any) -> None:
+        with self._lock:
+            if key in self._state and self._state[key] == value:
+                return
+            self._state[key] = value
+            self.touch()
+
+    def bind(self, key: str, getter: typing.Callable[[], typing.Any]) -> None:
+        """Store `key` as getter()'s value, read only when state.json is
+        written. For large values that change often (e.g. rotation show
+        counts): the owner calls touch() after a change instead of copying
+        the value into set() every time. getter() runs on the flush thread,
+        so it must be safe to call from there."""
+        with self._lock:
+            self._bound[key] = getter
+
+    def touch(self) -> None:
+        """Mark the store dirty (a bound value changed); written behind."""
+        with self._lock:
+            self._dirty = True
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.FLUSH_INTERVAL_SECONDS, self._timed_flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def setdefault(self, key: str, value: typing.Any) -> typing.Any:
+        """Set `key` only if it has no value yet (e.g. migrating legacy state)."""
+        with self._lock:
+            if self._state.get(key) in (None, ""):
+                self.set(key, value)
+            return self._state[key]
+
+    def _timed_flush(self) -> None:
+        with self._lock:
+            self._flush_timer = None
+        try:
+            self.flush()
+        except OSError as e:
+            logger.error(f"Could not save state.json: {e}")
+
+    def flush(self) -> None:
+        """Write pending changes now. Call on exit and before a restart."""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if self._dirty:
+                self._save_state()
+                self._dirty = False
+
+
+if __name__ == "__main__":
+    sm = StateManager()
+    print(sm.get("current_image"))
@@ -1,9 +1,12 @@
-import hashlib
+import json
 import logging
 import os
 import shutil
 import subprocess
 import sys
+import threading
+import time
+import typing
 
 logger = logging.getLogger(__name__)
 
@@ -12,19 +15,24 @@ MAIN_SCRIPT = os.path.join(REPO_ROOT, "src", "main.py")
 # Runtime state the frame writes at startup/use. It is snapshotted and restored
 # around the pull so a fast-forward is never blocked and the device keeps its
 # settings + image history — including the one-time pull that de-tracks them.
-RUNTIME_FILES = ("configs.json", "imgs/records.json")
+RUNTIME_FILES = ("configs.json", "state.json", "imgs/records.json")
+STAGE_DIRNAME = "sync-stage"
+# Warm state the old process hands to the one replacing it (see write_handoff).
+HANDOFF_PATH = os.path.join(REPO_ROOT, "handoff.json")
+HANDOFF_VERSION = 1
+HANDOFF_MAX_AGE_SECONDS = 300
 
 
-def _run(cmd, timeout=600):
+def _run(cmd, cwd=REPO_ROOT, timeout=600):
     return subprocess.run(
-        cmd, cwd=REPO_ROOT, capture_output=True, text=True, timeout=timeout
+        cmd, cwd=cwd, capture_output=True, text=True, timeout=timeout
     )
 
 
-def _backup_runtime_files():
+def _backup_runtime_files(repo_root=REPO_ROOT):
     backups = {}
     for rel in RUNTIME_FILES:
-        path = os.path.join(REPO_ROOT, *rel.split("/"))
+        path = os.path.join(repo_root, *rel.split("/"))
         if os.path.exists(path):
             try:
                 with open(path, "rb") as f:
@@ -44,15 +52,6 @@ def _restore_runtime_files(backups):
             pass
 
 
-def _file_hash(path):
-    if not os.path.exists(path):
-        return None
-    h = hashlib.sha256()
-    with open(path, "rb") as f:
-        h.update(f.read())
-    return h.hexdigest()
-
-
 def _resolve_uv():
     """Find the uv executable; under systemd the user PATH may be missing."""
     uv = shutil.which("uv")
@@ -65,51 +64,121 @@ def _resolve_uv():
     return None
 
 
-def perform_sync(status=logger.info) -> dict:
-    """Pull the latest code; if uv.lock changed, run `uv sync`.
+class FetchError(Exception):
+    """`git fetch` failed (e.g. offline, or the remote is broken)."""
 
-    Returns {ok, updated, deps_changed, message}. Never raises.
+
+def check_for_update(repo_root=REPO_ROOT) -> typing.Optional[str]:
+    """`git fetch` and return the upstream commit if HEAD can fast-forward to it.
+
+    None when already up to date or diverged; raises FetchError if the fetch
+    failed, since then nothing is known about the remote.
     """
-    result = {"ok": False, "updated": False, "deps_changed": False, "message": ""}
-    try:
-        status("Checking git...")
-        head_before = _run(["git", "rev-parse", "HEAD"]).stdout.strip()
-        lock_path = os.path.join(REPO_ROOT, "uv.lock")
-        lock_before = _file_hash(lock_path)
+    fetch = _run(["git", "fetch", "--quiet"], cwd=repo_root, timeout=120)
+    if fetch.returncode != 0:
+        raise FetchError((fetch.stderr or fetch.stdout).strip())
+    head = _run(["git", "rev-parse", "HEAD"], cwd=repo_root).stdout.strip()
+    upstream = _run(["git", "rev-parse", "@{u}"], cwd=repo_root).stdout.strip()
+    if not upstream or upstream == head:
+        return None
+    if _run(["git", "merge-base", "--is-ancestor", "HEAD", upstream], cwd=repo_root).returncode != 0:
+        logger.warning(f"Local HEAD is not an ancestor of {upstream}; not offering the update.")
+        return None
+    return upstream
 
-        # Snapshot runtime data, clear any tracked edits so the pull can
-        # fast-forward, then write the snapshot back afterwards.
-        backups = _backup_runtime_files()
-        for rel in RUNTIME_FILES:
-            _run(["git", "checkout", "--", rel])
 
-        status("Pulling updates...")
-        pull = _run(["git", "pull", "--ff-only"])
-        _restore_runtime_files(backups)
-        if pull.returncode != 0:
-            result["message"] = "git pull failed:\n" + (pull.stderr or pull.stdout).strip()
-            return result
+def _stage_dir(repo_root):
+    # Inside .git, so the staged checkout never shows up in `git status`.
+    return os.path.join(repo_root, ".git", STAGE_DIRNAME)
+
 
-        head_after = _run(["git", "rev-parse", "HEAD"]).stdout.strip()
-        result["updated"] = bool(head_before) and (head_before != head_after)
+def _remove_stage(repo_root):
+    stage_dir = _stage_dir(repo_root)
+    if os.path.exists(stage_dir):
+        _run(["git", "worktree", "remove", "--force", stage_dir], cwd=repo_root)
+        shutil.rmtree(stage_dir, ignore_errors=True)
+    _run(["git", "worktree", "prune"], cwd=repo_root)
 
-        if not result["updated"]:
-            result["ok"] = True
-            result["message"] = "Already up to date."
+
+def stage_update(target, repo_root=REPO_ROOT, status=logger.info) -> dict:
+    """Prepare `target` in a side checkout without touching the running tree.
+
+    The commit is checked out into a detached worktree under .git/, its sources
+    must byte-compile, and if uv.lock changed `uv sync` runs there so every new
+    package lands in uv's cache (the later sync of the live venv then only
+    links them). Returns {ok, target, deps_changed, message}. Never raises.
+    """
+    result = {"ok": False, "target": target, "deps_changed": False, "message": ""}
+    try:
+        stage_dir = _stage_dir(repo_root)
+        _remove_stage(repo_root)
+        status("Staging update...")
+        add = _run(["git", "worktree", "add", "--detach", stage_dir, target], cwd=repo_root)
+        if add.returncode != 0:
+            result["message"] = "Could not stage update:\n" + (add.stderr or add.stdout).strip()
             return result
 
-        if lock_before != _file_hash(lock_path):
+        compiled = _run([sys.executable, "-m", "compileall", "-q", "src"], cwd=stage_dir)
+        if compiled.returncode != 0:
+            result["message"] = "Update does not compile:\n" + (compiled.stderr or compiled.stdout).strip()
+            _remove_stage(repo_root)
+            return result
+
+        lock_diff = _run(["git", "diff", "--quiet", "HEAD", target, "--", "uv.lock"], cwd=repo_root)
+        if lock_diff.returncode != 0:
             uv = _resolve_uv()
             if uv is None:
-                result["message"] = "Updated, but 'uv' not found to install new dependencies."
+                result["message"] = "Update needs new dependencies, but 'uv' was not found."
                 return result
-            status("Installing dependencies...")
-            sync = _run([uv, "sync"])
+            status("Downloading dependencies...")
+            sync = _run([uv, "sync", "--frozen"], cwd=stage_dir)
             if sync.returncode != 0:
                 result["message"] = "uv sync failed:\n" + (sync.stderr or sync.stdout).strip()
                 return result
             result["deps_changed"] = True
 
+        result["ok"] = True
+        result["message"] = "Update staged."
+        return result
+    except Exception as e:
+        result["message"] = f"Staging error: {e}"
+        return result
+
+
+def apply_update(staged, repo_root=REPO_ROOT, status=logger.info) -> dict:
+    """Switch the live tree to a commit prepared by stage_update.
+
+    Everything slow already happened while staging, so this is a local
+    fast-forward (no network), a `uv sync` from a warm cache if dependencies
+    changed, and a byte-compile of src/ so the restart loads cached bytecode.
+    Returns {ok, updated, deps_changed, message}. Never raises.
+    """
+    result = {"ok": False, "updated": False, "deps_changed": staged["deps_changed"], "message": ""}
+    try:
+        # Snapshot runtime data, clear any tracked edits so the merge can
+        # fast-forward, then write the snapshot back afterwards.
+        backups = _backup_runtime_files(repo_root)
+        for rel in RUNTIME_FILES:
+            _run(["git", "checkout", "--", rel], cwd=repo_root)
+
+        status("Switching to the new version...")
+        merge = _run(["git", "merge", "--ff-only", "--quiet", staged["target"]], cwd=repo_root)
+        _restore_runtime_files(backups)
+        if merge.returncode != 0:
+            result["message"] = "git merge failed:\n" + (merge.stderr or merge.stdout).strip()
+            return result
+        result["updated"] = True
+
+        if staged["deps_changed"]:
+            status("Installing dependencies...")
+            sync = _run([_resolve_uv() or "uv", "sync"], cwd=repo_root)
+            if sync.returncode != 0:
+                result["message"] = "uv sync failed:\n" + (sync.stderr or sync.stdout).strip()
+                return result
+
+        _run([sys.executable, "-m", "compileall", "-q", "src"], cwd=repo_root)
+        _remove_stage(repo_root)
+
         result["ok"] = True
         result["message"] = "Updated. Restarting..."
         return result
@@ -118,6 +187,154 @@ def perform_sync(status=logger.info) -> dict:
         return result
 
 
+def perform_sync(status=logger.info, repo_root=REPO_ROOT, staged=None) -> dict:
+    """Fetch, stage and apply the latest code in one go.
+
+    Pass a still-current result of stage_update as `staged` to skip straight
+    to the switch. Returns {ok, updated, deps_changed, message}. Never raises.
+    """
+    status("Checking for updates...")
+    try:
+        target = check_for_update(repo_root)
+    except FetchError as e:
+        # Keep any stage: the remote may still have that commit.
+        return {"ok": False, "updated": False, "deps_changed": False, "message": f"git fetch failed:\n{e}"}
+    except Exception as e:
+        return {"ok": False, "updated": False, "deps_changed": False, "message": f"Sync error: {e}"}
+    if target is None:
+        _remove_stage(repo_root)
+        return {"ok": True, "updated": False, "deps_changed": False, "message": "Already up to date."}
+    if staged is None or not staged["ok"] or staged["target"] != target:
+        staged = stage_update(target, repo_root, status)
+        if not staged["ok"]:
+            return {"ok": False, "updated": False, "deps_changed": False, "message": staged["message"]}
+    return apply_update(staged, repo_root, status)
+
+
+class UpdateChecker:
+    """Fetches in the background every CHECK_INTERVAL_SECONDS and stages any
+    new commit, so that a SYNC tap only has to run apply_update.
+
+    `on_update(staged)` is called from the checker thread when an update has
+    been staged.
+
+    The fetch runs without any lock held, and SYNC never waits on it or on a
+    stage in progress: it switches to the last completed stage right away.
+    """
+
+    FIRST_CHECK_DELAY_SECONDS = 120
+    CHECK_INTERVAL_SECONDS = 6 * 3600
+
+    def __init__(self, on_update=None, repo_root=REPO_ROOT):
+        self.on_update = on_update
+        self.repo_root = repo_root
+        self.staged = None
+        # _lock guards `staged`; _stage_lock allows one stage (or unstaged
+        # sync) at a time and is only ever tried, never waited on.
+        self._lock = threading.Lock()
+        self._stage_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="update-checker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+
+    def _loop(self):
+        delay = self.FIRST_CHECK_DELAY_SECONDS
+        while not self._stopping.wait(delay):
+            delay = self.CHECK_INTERVAL_SECONDS
+            self.check_now()
+
+    def check_now(self):
+        try:
+            target = check_for_update(self.repo_root)
+        except FetchError as e:
+            logger.info(f"git fetch failed: {e}")
+            return
+        if target is None:
+            return
+        with self._lock:
+            if self.staged and self.staged["target"] == target:
+                return
+        if not self._stage_lock.acquire(blocking=False):
+            return  # a stage is already in progress
+        try:
+            staged = stage_update(target, self.repo_root)
+        finally:
+            self._stage_lock.release()
+        if not staged["ok"]:
+            logger.warning(f"Could not stage update {target}: {staged['message']}")
+            return
+        with self._lock:
+            self.staged = staged
+        logger.info(f"Update {target[:8]} staged.")
+        if self.on_update is not None:
+            self.on_update(staged)
+
+    def sync(self, status=logger.info) -> dict:
+        """Switch to the last staged update without fetching. With nothing
+        staged, fetch, stage and apply in one go, unless a background stage
+        is already running; then ask to try again instead of blocking."""
+        with self._lock:
+            staged, self.staged = self.staged, None
+        if staged is not None:
+            # A newer stage may be in progress; the restart that follows
+            # this switch simply abandons it.
+            return apply_update(staged, self.repo_root, status)
+        if not self._stage_lock.acquire(blocking=False):
+            return {"ok": True, "updated": False, "deps_changed": False,
+                    "message": "An update is being prepared. Try again in a minute."}
+        try:
+            return perform_sync(status, self.repo_root)
+        finally:
+            self._stage_lock.release()
+
+
+def write_handoff(data: dict, path=HANDOFF_PATH) -> None:
+    """Save warm state for the next process, right before restart_process().
+
+    `data` must be JSON-serializable.
+    """
+    payload = {"version": HANDOFF_VERSION, "created": time.time(), "pid": os.getpid(), **data}
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "w") as f:
+            json.dump(payload, f, default=str)
+        os.replace(tmp, path)
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning(f"Could not write handoff: {e}")
+
+
+def take_handoff(path=HANDOFF_PATH, max_age=HANDOFF_MAX_AGE_SECONDS) -> dict:
+    """Read and delete the handoff left by the previous process.
+
+    Returns {} if there is none, or it is stale (e.g. a crash long after it
+    was written) or from another format version. Consumed once, so a later
+    cold boot never adopts old state.
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            payload = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Ignoring unreadable handoff: {e}")
+        payload = {}
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    if payload.get("version") != HANDOFF_VERSION or time.time() - payload.get("created", 0) > max_age:
+        return {}
+    logger.info(f"Adopting warm state from process {payload.get('pid')}.")
+    return payload
+
+
 def restart_process():
     """Replace the current process with a fresh run of the app.
 
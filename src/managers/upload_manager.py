@@ -1,16 +1,24 @@
+import collections
+import concurrent.futures
+import json
 import logging
+import multiprocessing
+import os
+import queue
+import signal
 import socket
+import tempfile
 import threading
+import time
+import typing
+import uuid
 
-from PIL import Image, ImageOps
-from flask import Flask, request
+from flask import Flask, abort, jsonify, request, send_file
 
-logger = logging.getLogger(__name__)
-
-# Cap decoded pixels so a decompression-bomb upload can't OOM the Pi. Pillow
-# raises DecompressionBombError past 2x this, which the upload handler catches.
-Image.MAX_IMAGE_PIXELS = 50_000_000
+import imaging
+from wsgi_server import PooledWSGIServer
 
+logger = logging.getLogger(__name__)
 
 UPLOAD_PAGE = """<!doctype html>
 <html lang="en">
@@ -32,81 +40,623 @@ UPLOAD_PAGE = """<!doctype html>
     button {{ width:100%; padding:15px; font-size:16px; font-weight:700; border:0;
               border-radius:10px; background:#8df0ad; color:#141414; }}
     .msg {{ margin-top:18px; font-size:14px; color:#8df0ad; }}
+    .msg.err {{ color:#ff5447; }}
+    ul.files {{ list-style:none; margin:18px 0 0; padding:0; font-size:13px; }}
+    ul.files li {{ display:flex; justify-content:space-between; gap:12px; padding:6px 0;
+                  border-bottom:1px solid #2c2c2c; }}
+    ul.files .name {{ overflow:hidden; text-overflow:ellipsis; white-space:nowrap; }}
+    ul.files .state {{ color:#b9b29c; flex:none; }}
+    ul.files .done {{ color:#8df0ad; }}
+    ul.files .failed {{ color:#ff5447; }}
   </style>
 </head>
 <body>
   <div class="card">
     <h1>AI ART FRAME</h1>
     <p>Pick one or more images to send to the frame.</p>
-    <form method="POST" action="/upload" enctype="multipart/form-data">
+    <form id="upload" method="POST" action="/upload" enctype="multipart/form-data">
       <input type="file" name="images" accept="image/*" multiple required>
       <button type="submit">Upload</button>
     </form>
     {msg}
+    <ul class="files" id="files"></ul>
   </div>
+  {script}
 </body>
 </html>"""
 
 
+# Progressive enhancement for the form above: downscale each image in the
+# browser to the frame's 1152x2048 target (honoring EXIF orientation) and
+# upload a few at a time with per-file progress, instead of posting full-size
+# originals. Without JS (or without canvas support) the plain form still posts
+# originals, which the server decodes and validates either way.
+UPLOAD_SCRIPT = """<script>
+(function () {
+  var TARGET_W = 1152, TARGET_H = 2048, QUALITY = 0.92, PARALLEL = 3;
+  var form = document.getElementById("upload"), list = document.getElementById("files");
+  if (!window.createImageBitmap || !window.XMLHttpRequest || !window.fetch) return;
+
+  function row(name) {
+    var li = document.createElement("li"), n = document.createElement("span"), st = document.createElement("span");
+    n.className = "name"; n.textContent = name; st.className = "state"; st.textContent = "waiting";
+    li.appendChild(n); li.appendChild(st); list.appendChild(li);
+    return function (text, cls) { st.textContent = text; st.className = "state" + (cls ? " " + cls : ""); };
+  }
+
+  function downscale(file) {
+    return createImageBitmap(file, { imageOrientation: "from-image" }).then(function (bmp) {
+      var scale = Math.min(TARGET_W / bmp.width, TARGET_H / bmp.height, 1);
+      if (scale === 1 && file.size < 4 * 1024 * 1024) { bmp.close(); return file; }
+      var w = Math.max(1, Math.round(bmp.width * scale)), h = Math.max(1, Math.round(bmp.height * scale));
+      var canvas = document.createElement("canvas");
+      canvas.width = w; canvas.height = h;
+      var ctx = canvas.getContext("2d");
+      ctx.imageSmoothingQuality = "high";
+      ctx.drawImage(bmp, 0, 0, w, h);
+      bmp.close();
+      var type = file.type === "image/png" ? "image/png" : "image/jpeg";
+      return new Promise(function (resolve) {
+        canvas.toBlob(function (blob) {
+          if (!blob) { resolve(file); return; }
+          var base = file.name.replace(/\\.[^.]*$/, "");
+          resolve(new File([blob], base + (type === "image/png" ? ".png" : ".jpg"), { type: type }));
+        }, type, QUALITY);
+      });
+    }).catch(function () { return file; });  // undecodable here (e.g. HEIC): send as-is
+  }
+
+  function send(file, batch, batchSize, update) {
+    return new Promise(function (resolve) {
+      var data = new FormData(), xhr = new XMLHttpRequest();
+      data.append("images", file, file.name);
+      data.append("batch", batch);
+      data.append("batch_size", batchSize);
+      xhr.open("POST", "/upload");
+      xhr.setRequestHeader("Accept", "application/json");
+      xhr.upload.onprogress = function (e) {
+        if (e.lengthComputable) update("uploading " + Math.round(100 * e.loaded / e.total) + "%");
+      };
+      xhr.onload = function () {
+        var job = null;
+        try { job = JSON.parse(xhr.responseText).jobs[0]; } catch (err) {}
+        if (xhr.status !== 200 || !job) update("failed", "failed");
+        else if (job.state === "failed") update(job.error || "failed", "failed");
+        else { update("processing"); watch(job.id, update); }
+        resolve();
+      };
+      xhr.onerror = function () { update("network error", "failed"); resolve(); };
+      xhr.send(data);
+    });
+  }
+
+  function watch(id, update) {
+    fetch("/status/" + id).then(function (r) { return r.json(); }).then(function (job) {
+      if (job.state === "done") update("added", "done");
+      else if (job.state === "failed") update(job.error || "failed", "failed");
+      else setTimeout(function () { watch(id, update); }, 1000);
+    }).catch(function () { setTimeout(function () { watch(id, update); }, 3000); });
+  }
+
+  form.addEventListener("submit", function (e) {
+    var files = Array.prototype.slice.call(form.elements.images.files);
+    if (!files.length) return;
+    e.preventDefault();
+    list.innerHTML = "";
+    // One batch per selection, so the frame shows only the last image of it.
+    var batch = Date.now().toString(36) + Math.random().toString(36).slice(2);
+    var queue = files.map(function (f) { return { file: f, update: row(f.name) }; });
+    function next() {
+      var item = queue.shift();
+      if (!item) return Promise.resolve();
+      item.update("resizing");
+      return downscale(item.file).then(function (f) { return send(f, batch, files.length, item.update); }).then(next);
+    }
+    for (var i = 0; i < Math.min(PARALLEL, queue.length); i++) next();
+    form.reset();
+  });
+})();
+</script>"""
+
+# Polls /status for the jobs of the upload just made and rewrites the message
+# in place. %s is the JSON list of job ids.
+STATUS_SCRIPT = """<script>
+(function () {
+  var ids = %s, msg = document.getElementById("status");
+  function poll() {
+    fetch("/status?ids=" + ids.join(",")).then(function (r) { return r.json(); }).then(function (jobs) {
+      var done = 0, failed = 0;
+      jobs.forEach(function (j) { if (j.state === "done") done++; else if (j.state === "failed") failed++; });
+      var pending = ids.length - done - failed;
+      msg.textContent = "Added " + done + " of " + ids.length + " image(s)"
+        + (failed ? ", " + failed + " failed" : "") + (pending ? " \u2014 processing..." : ".");
+      if (pending) setTimeout(poll, 1000);
+    }).catch(function () { setTimeout(poll, 3000); });
+  }
+  poll();
+})();
+</script>"""
+
+
 class UploadServer:
     """Small LAN-only web server so a phone/browser can push images to the frame.
 
-    `on_image(pil_image, title)` is invoked on the server's worker thread once
-    per uploaded file. It must persist the image itself (ImageManager is
-    thread-safe) and marshal any GUI work back onto the Tk main thread.
+    Uploads are spooled to disk and acknowledged immediately; a small worker
+    pool then decodes them (at most `max_decodes` at a time, to bound RAM) and
+    hands each to `on_image(pil_image, title)`, which must persist the image
+    itself (ImageManager is thread-safe) and marshal any GUI work back onto the
+    Tk main thread. Per-file progress is exposed at /status.
+
+    Files that arrive together form a batch: one multi-file POST, or several
+    POSTs sharing the `batch` / `batch_size` form fields (as the upload page's
+    script sends). Once every file of a batch has been processed,
+    `on_batch_end(batch_id)` is called so the app can apply the whole batch to
+    the UI in one pass.
+
+    With an `image_manager`, a JSON gallery API is served under /api/records:
+    paginated listing, display (`on_display(uuid)`), delete (`on_delete(uuid)`),
+    favorite toggling via PATCH (`on_update(record)`) and cacheable full-image /
+    thumbnail downloads. The callbacks run on the request thread, like
+    `on_image`.
     """
 
-    def __init__(self, on_image, port: int = 8080, max_mb: int = 32):
+    # Finished jobs kept around for /status polling.
+    MAX_TRACKED_JOBS = 500
+    # A batch with no new file or finished job for this long is dropped (e.g.
+    # the phone went away mid-upload); the app flushes its records anyway.
+    BATCH_MAX_IDLE_SECONDS = 600
+    # Images are immutable per uuid, so phones may reuse them for a week; the
+    # ETag / Last-Modified revalidation covers anything that does change.
+    IMAGE_MAX_AGE = 7 * 24 * 3600
+    MAX_PAGE_SIZE = 100
+
+    def __init__(self, on_image, port: int = 8080, max_mb: int = 32, spool_dir=None,
+                 workers: int = 2, max_decodes: int = 1, max_pending: int = 64, on_batch_end=None,
+                 image_manager=None, on_display=None, on_delete=None, on_update=None):
         self.on_image = on_image
+        self.on_batch_end = on_batch_end
+        self.image_manager = image_manager
+        self.on_display = on_display
+        self.on_delete = on_delete
+        self.on_update = on_update
         self.port = port
 
+        self.spool_dir = spool_dir or os.path.join(tempfile.gettempdir(), "ai-art-frame-uploads")
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.max_pending = max_pending
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upload")
+        self._decode_slots = threading.BoundedSemaphore(max_decodes)
+        self._jobs = collections.OrderedDict()
+        self._batches = {}
+        self._jobs_lock = threading.Lock()
+
         self.app = Flask(__name__)
         self.app.config["MAX_CONTENT_LENGTH"] = max_mb * 1024 * 1024
         self.app.add_url_rule("/", "index", self._index, methods=["GET"])
         self.app.add_url_rule("/upload", "upload", self._upload, methods=["POST"])
+        self.app.add_url_rule("/status", "status", self._status, methods=["GET"])
+        self.app.add_url_rule("/status/<job_id>", "job_status", self._job_status, methods=["GET"])
+        if self.image_manager is not None:
+            self.app.add_url_rule("/api/records", "records", self._api_records, methods=["GET"])
+            self.app.add_url_rule("/api/records/<record_id>", "record", self._api_record, methods=["GET", "DELETE", "PATCH"])
+            self.app.add_url_rule("/api/records/<record_id>/display", "record_display", self._api_display, methods=["POST"])
+            self.app.add_url_rule("/api/records/<record_id>/image", "record_image", self._api_image, methods=["GET"])
+            self.app.add_url_rule("/api/records/<record_id>/thumbnail", "record_thumbnail", self._api_thumbnail, methods=["GET"])
 
+        self._server = None
         self._thread = None
 
+    @staticmethod
+    def _render_page(msg: str = "") -> str:
+        return UPLOAD_PAGE.format(msg=msg, script=UPLOAD_SCRIPT)
+
     def _index(self):
-        return UPLOAD_PAGE.format(msg="")
+        return self._render_page()
 
-    def _upload(self):
-        files = request.files.getlist("images")
-        saved = 0
-        for storage in files:
-            if not storage or not storage.filename:
+    @staticmethod
+    def _title_from_filename(filename: str) -> str:
+        title = filename.rsplit(".", 1)[0].replace("_", " ").replace("-", " ").strip()
+        return title or "Uploaded"
+
+    def _pending_count(self) -> int:
+        return sum(1 for job in self._jobs.values() if job["state"] in ("queued", "processing"))
+
+    def _set_job(self, job_id, **fields):
+        with self._jobs_lock:
+            self._jobs[job_id].update(fields)
+
+    def _enqueue(self, storage, batch_id) -> dict:
+        job_id = uuid.uuid4().hex
+        job = {"id": job_id, "filename": storage.filename, "batch": batch_id,
+               "state": "queued", "uuid": None, "error": None}
+        with self._jobs_lock:
+            self._jobs[job_id] = job
+            self._evict_finished_jobs()
+            busy = self._pending_count() > self.max_pending
+
+        if busy:
+            self._finish_job(job_id, state="failed", error="frame is busy, try again shortly")
+            return job
+
+        path = os.path.join(self.spool_dir, f"{job_id}.upload")
+        try:
+            storage.save(path)
+        except OSError as e:
+            logger.warning(f"Could not spool upload {storage.filename!r}: {e}")
+            self._finish_job(job_id, state="failed", error="could not store upload")
+            return job
+
+        self._executor.submit(self._process_job, job_id, path, self._title_from_filename(storage.filename))
+        return job
+
+    def _evict_finished_jobs(self) -> None:
+        # Caller holds _jobs_lock. Oldest first, and only jobs that are done
+        # or failed: a queued job still needs its entry.
+        excess = len(self._jobs) - self.MAX_TRACKED_JOBS
+        if excess <= 0:
+            return
+        finished = [job_id for job_id, job in self._jobs.items() if job["state"] in ("done", "failed")]
+        for job_id in finished[:excess]:
+            del self._jobs[job_id]
+
+    def pending_jobs(self) -> typing.Dict[str, str]:
+        """{job id: title} of uploads still waiting for an ingest worker. After
+        stop() their spool files stay put for resume_spooled() in the next run."""
+        with self._jobs_lock:
+            return {job["id"]: self._title_from_filename(job["filename"])
+                    for job in self._jobs.values() if job["state"] == "queued"}
+
+    def resume_spooled(self, titles: typing.Optional[typing.Dict[str, str]] = None) -> int:
+        """Queue uploads a previous run left in the spool directory.
+
+        `titles` (from pending_jobs() of that run) restores their titles;
+        anything else in the spool gets a generic one.
+        """
+        titles = titles or {}
+        count = 0
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not name.endswith(".upload"):
                 continue
+            job_id = name[:-len(".upload")]
+            title = titles.get(job_id, "upload")
+            with self._jobs_lock:
+                self._jobs[job_id] = {"id": job_id, "filename": title, "batch": None,
+                                      "state": "queued", "uuid": None, "error": None}
+            self._executor.submit(self._process_job, job_id, os.path.join(self.spool_dir, name), title)
+            count += 1
+        if count:
+            logger.info(f"Resuming {count} spooled upload(s) from the previous run.")
+        return count
+
+    def _finish_job(self, job_id, **fields):
+        """Record a job's final state and fire on_batch_end if it completed its batch."""
+        batch_done = None
+        with self._jobs_lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            batch = self._batches.get(job["batch"])
+            if batch is not None:
+                batch["finished"] += 1
+                batch["touched"] = time.monotonic()
+                if batch["finished"] >= batch["expected"]:
+                    del self._batches[job["batch"]]
+                    batch_done = job["batch"]
+
+        if batch_done is not None and self.on_batch_end is not None:
             try:
-                image = Image.open(storage.stream)
-                image = ImageOps.exif_transpose(image)
-                image.load()  # fully read before the request stream closes
-                image.thumbnail((2048, 2048), Image.LANCZOS)  # cap stored size / RAM
+                self.on_batch_end(batch_done)
             except Exception as e:
-                logger.warning(f"Skipping unreadable/oversized upload {storage.filename!r}: {e}")
-                continue
-            title = storage.filename.rsplit(".", 1)[0].replace("_", " ").replace("-", " ").strip()
+                logger.exception(f"Upload batch handler failed: {e}")
+
+    def _expire_batches(self) -> None:
+        # Caller holds _jobs_lock.
+        cutoff = time.monotonic() - self.BATCH_MAX_IDLE_SECONDS
+        for batch_id in [b for b, batch in self._batches.items() if batch["touched"] < cutoff]:
+            logger.info(f"Dropping upload batch {batch_id}: "
+                        f"{self._batches[batch_id]['finished']}/{self._batches[batch_id]['expected']} files arrived.")
+            del self._batches[batch_id]
+
+    def _process_job(self, job_id, path, title):
+        try:
+            self._set_job(job_id, state="processing")
+            try:
+                # Bound how many decodes are in flight at once; the decode
+                # itself runs on the shared imaging process pool.
+                with self._decode_slots:
+                    image = imaging.get_service().decode_upload(path)
+            except Exception as e:
+                logger.warning(f"Skipping unreadable/oversized upload {title!r}: {e}")
+                self._finish_job(job_id, state="failed", error="not a readable image")
+                return
             try:
-                self.on_image(image, title or "Uploaded")
-                saved += 1
+                record = self.on_image(image, title)
             except Exception as e:
                 logger.exception(f"Upload ingest failed: {e}")
+                self._finish_job(job_id, state="failed", error="could not save image")
+                return
+            self._finish_job(job_id, state="done", uuid=getattr(record, "uuid", None))
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _upload(self):
+        files = [storage for storage in request.files.getlist("images") if storage and storage.filename]
+        # A client-declared batch may span several requests; otherwise this
+        # request is its own batch.
+        batch_id = request.form.get("batch") or uuid.uuid4().hex
+        try:
+            batch_size = int(request.form.get("batch_size", len(files)))
+        except ValueError:
+            batch_size = len(files)
+        if files:
+            with self._jobs_lock:
+                self._expire_batches()
+                batch = self._batches.setdefault(
+                    batch_id, {"expected": max(1, min(batch_size, self.MAX_TRACKED_JOBS)), "finished": 0})
+                batch["touched"] = time.monotonic()
+
+        jobs = [self._enqueue(storage, batch_id) for storage in files]
+
+        if request.accept_mimetypes.best == "application/json":
+            with self._jobs_lock:
+                return jsonify({"jobs": [dict(job) for job in jobs]})
 
-        if saved:
-            msg = f'<div class="msg">Added {saved} image(s) to the frame.</div>'
+        accepted = [job["id"] for job in jobs if job["state"] != "failed"]
+        if accepted:
+            msg = (f'<div class="msg" id="status">Received {len(accepted)} image(s); processing...</div>'
+                   + STATUS_SCRIPT % json.dumps(accepted))
         else:
-            msg = '<div class="msg" style="color:#ff5447">No valid images found.</div>'
-        return UPLOAD_PAGE.format(msg=msg)
+            msg = '<div class="msg err">No valid images found.</div>'
+        return self._render_page(msg)
+
+    def _status(self):
+        ids = [i for i in request.args.get("ids", "").split(",") if i]
+        with self._jobs_lock:
+            return jsonify([dict(self._jobs[i]) for i in ids if i in self._jobs])
+
+    def _job_status(self, job_id):
+        with self._jobs_lock:
+            job = self._jobs.get(job_id)
+            job = dict(job) if job is not None else None
+        if job is None:
+            return jsonify({"error": "unknown job"}), 404
+        return jsonify(job)
+
+    # ---- gallery API ----
+    @staticmethod
+    def _record_json(record) -> dict:
+        return {
+            "uuid": record.uuid,
+            "title": record.title,
+            "prompt": record.prompt,
+            "date": record.date.isoformat() if record.date else None,
+            "model": record.model,
+            "style": record.style,
+            "favorite": record.favorite,
+            "timings": record.timings,
+            "image": f"/api/records/{record.uuid}/image",
+            "thumbnail": f"/api/records/{record.uuid}/thumbnail",
+        }
+
+    def _get_record_or_404(self, record_id):
+        record = self.image_manager.get_record(record_id)
+        if record is None:
+            abort(404)
+        return record
+
+    def _api_records(self):
+        page = max(1, request.args.get("page", 1, type=int))
+        per_page = min(self.MAX_PAGE_SIZE, max(1, request.args.get("per_page", 24, type=int)))
+        newest_first = request.args.get("order", "newest") != "oldest"
+        records, total = self.image_manager.get_records_page((page - 1) * per_page, per_page, newest_first)
+        return jsonify({
+            "records": [self._record_json(r) for r in records],
+            "page": page,
+            "per_page": per_page,
+            "total": total,
+        })
+
+    def _api_record(self, record_id):
+        record = self._get_record_or_404(record_id)
+        if request.method == "DELETE":
+            if self.on_delete is None:
+                abort(405)
+            self.on_delete(record.uuid)
+            return jsonify({"deleted": record.uuid}), 202
+        if request.method == "PATCH":
+            body = request.get_json(silent=True) or {}
+            if not isinstance(body.get("favorite"), bool):
+                return jsonify({"error": "expected {\"favorite\": true|false}"}), 400
+            record = self.image_manager.set_favorite(record.uuid, body["favorite"])
+            if record is None:
+                abort(404)
+            if self.on_update is not None:
+                self.on_update(record)
+        return jsonify(self._record_json(record))
+
+    def _api_display(self, record_id):
+        record = self._get_record_or_404(record_id)
+        if self.on_display is None:
+            abort(405)
+        self.on_display(record.uuid)
+        return jsonify({"displayed": record.uuid}), 202
+
+    def _send_image(self, path, mimetype):
+        # conditional=True answers If-None-Match / If-Modified-Since with 304;
+        # the body goes through the server's wsgi.file_wrapper (no copy in Python).
+        return send_file(path, mimetype=mimetype, conditional=True, etag=True, max_age=self.IMAGE_MAX_AGE)
+
+    def _api_image(self, record_id):
+        record = self._get_record_or_404(record_id)
+        path = os.path.abspath(self.image_manager.uuid_to_path(record.uuid))
+        if not os.path.exists(path):
+            abort(404)
+        return self._send_image(path, "image/png")
+
+    def _api_thumbnail(self, record_id):
+        record = self._get_record_or_404(record_id)
+        try:
+            path = self.image_manager.ensure_thumbnail(record.uuid)
+        except Exception as e:
+            logger.warning(f"Thumbnail for {record.uuid} failed: {e}")
+            path = None
+        if path is None:
+            abort(404)
+        return self._send_image(os.path.abspath(path), "image/jpeg")
 
     def get_url(self) -> str:
         return f"http://{get_lan_ip()}:{self.port}/"
 
+    def start(self, http_workers: int = 4, max_queued_connections: int = 16, request_timeout: float = 30):
+        """Serve on a bounded thread pool (see PooledWSGIServer) in a daemon thread."""
+        self._server = PooledWSGIServer(
+            ("0.0.0.0", self.port), self.app,
+            workers=http_workers, max_queue=max_queued_connections, request_timeout=request_timeout,
+        )
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.5},
+                                        name="http-accept", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        """Graceful shutdown: stop accepting, finish in-flight requests, close.
+
+        Uploads still waiting for an ingest worker stay in the spool directory.
+        """
+        if self._server is not None:
+            try:
+                self._server.stop(timeout=timeout)
+            except Exception as e:
+                logger.warning(f"Upload server shutdown failed: {e}")
+            self._server = None
+        # Queued jobs are dropped, not run: their spool files are picked up by
+        # resume_spooled() in the next run.
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _serve_in_child(images_folder, port, spool_dir, max_mb, events):
+    """Child-process entry point for UploadServerProcess.
+
+    Runs a full UploadServer with its own ImageManager on the shared images
+    folder, and reports only small events to the parent over `events`. Image
+    work runs inline: this process is daemonic, so it can't have a pool.
+    """
+    from logging_config import setup_logging
+    from managers.image_manager import ImageManager
+
+    setup_logging()
+    imaging.run_inline()
+    image_manager = ImageManager(images_folder)
+
+    def on_image(image, title):
+        record = image_manager.save_uploaded_image(image, title)
+        events.put(("record", record))
+        return record
+
+    server = UploadServer(
+        on_image=on_image, port=port, max_mb=max_mb, spool_dir=spool_dir,
+        on_batch_end=lambda batch_id: events.put(("batch_end", batch_id)),
+        image_manager=image_manager,
+        on_display=lambda uuid: events.put(("display", uuid)),
+        on_delete=lambda uuid: events.put(("delete", uuid)),
+        on_update=lambda record: events.put(("update", record)),
+    )
+
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+    server.start()
+    server.resume_spooled()
+    logger.info(f"Upload server process {os.getpid()} serving on port {port}")
+    stopping.wait()
+    server.stop()
+
+
+class UploadServerProcess:
+    """Runs UploadServer in a child process, off the Tk process's GIL.
+
+    Decoding and PNG encoding then happen in the child (inline, not on the
+    imaging pool), which writes images and records.json into the shared
+    images folder itself. Only small events
+    cross the process boundary, over a multiprocessing queue, and are
+    dispatched on a listener thread in the app process:
+
+    - a new ImageRecord -> `on_record(record)`
+    - an upload batch completed -> `on_batch_end(batch_id)`
+    - gallery API display/delete -> `on_display(uuid)` / `on_delete(uuid)`
+    - gallery API favorite change -> `on_update(record)`
+
+    Same start()/stop()/get_url() interface as UploadServer.
+    """
+
+    def __init__(self, images_folder, on_record, port: int = 8080, max_mb: int = 32, spool_dir=None,
+                 on_batch_end=None, on_display=None, on_delete=None, on_update=None):
+        self.images_folder = images_folder
+        self.port = port
+        self.max_mb = max_mb
+        self.spool_dir = spool_dir
+        self._handlers = {
+            "record": on_record,
+            "batch_end": on_batch_end,
+            "display": on_display,
+            "delete": on_delete,
+            "update": on_update,
+        }
+
+        self._process = None
+        self._events = None
+        self._listener = None
+
     def start(self):
-        def _run():
-            self.app.run(host="0.0.0.0", port=self.port, threaded=True,
-                         use_reloader=False, debug=False)
+        # spawn, not fork: a forked copy of the Tk/X11 process is unsafe.
+        ctx = multiprocessing.get_context("spawn")
+        self._events = ctx.Queue()
+        self._process = ctx.Process(
+            target=_serve_in_child,
+            args=(self.images_folder, self.port, self.spool_dir, self.max_mb, self._events),
+            name="upload-server", daemon=True,
+        )
+        self._process.start()
+        self._listener = threading.Thread(target=self._listen, args=(self._process, self._events),
+                                          name="upload-events", daemon=True)
+        self._listener.start()
 
-        self._thread = threading.Thread(target=_run, daemon=True)
-        self._thread.start()
+    def _listen(self, process, events):
+        while True:
+            try:
+                event = events.get(timeout=1.0)
+            except queue.Empty:
+                if not process.is_alive():
+                    logger.warning("Upload server process exited.")
+                    return
+                continue
+            if event is None:
+                return
+            kind, payload = event
+            handler = self._handlers.get(kind)
+            if handler is None:
+                continue
+            try:
+                handler(payload)
+            except Exception as e:
+                logger.exception(f"Upload event {kind!r} failed: {e}")
+
+    def stop(self, timeout: float = 5):
+        if self._process is None:
+            return
+        self._process.terminate()  # SIGTERM -> graceful UploadServer.stop() in the child
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.kill()
+            self._process.join(1)
+        self._process = None
+        self._events.put(None)
+        self._listener.join(timeout=2)
+
+    def get_url(self) -> str:
+        return f"http://{get_lan_ip()}:{self.port}/"
 
 
 def get_lan_ip() -> str:
@@ -2,17 +2,16 @@ import logging
 import queue
 import uuid
 import threading
-import time
 import typing
 
 import requests
 import speech_recognition as sr
 
-from utils import get_openai_key
+import timing
+from utils import get_openai_key, get_openai_url
 
 logger = logging.getLogger(__name__)
 
-OPENAI_TRANSCRIBE_URL = "https://api.openai.com/v1/audio/transcriptions"
 TRANSCRIBE_MODEL = "whisper-1"
 
 
@@ -27,27 +26,30 @@ def transcribe_audio(audio_data, model: str = TRANSCRIBE_MODEL) -> typing.Option
     headers = {"Authorization": f"Bearer {get_openai_key()}"}
     files = {"file": ("audio.wav", wav, "audio/wav")}
     data = {"model": model}
-    response = requests.post(OPENAI_TRANSCRIBE_URL, headers=headers, files=files, data=data, timeout=60)
+    with timing.span("transcribe"):
+        response = requests.post(get_openai_url("audio/transcriptions"), headers=headers, files=files, data=data, timeout=60)
     if response.status_code != 200:
         raise RuntimeError(f"OpenAI transcription {response.status_code}: {response.text.strip()}")
     return response.json().get("text")
 
 
-def standard_recognize(
+def standard_listen(
     microphone: sr.Microphone,
     recognizer: sr.Recognizer,
     timeout: typing.Optional[int],
     start_callback: typing.Optional[typing.Callable[[], None]] = None,
     end_callback: typing.Optional[typing.Callable[[], None]] = None,
-    *,
-    to_lower: bool = True,
-) -> typing.Optional[str]:
+    calibrate_seconds: float = 1.0,
+) -> typing.Optional[sr.AudioData]:
+    """Calibrate, then capture one utterance. Returns None on timeout/mic error."""
     try:
         with microphone as source:
-            recognizer.adjust_for_ambient_noise(source)
+            with timing.span("calibrate"):
+                recognizer.adjust_for_ambient_noise(source, duration=calibrate_seconds)
             if start_callback:
                 start_callback()
-            audio = recognizer.listen(source, timeout=timeout)
+            with timing.span("listen"):
+                audio = recognizer.listen(source, timeout=timeout)
     except sr.WaitTimeoutError:
         logger.info("Listening timed out: no speech detected.")
         if end_callback:
@@ -62,6 +64,23 @@ def standard_recognize(
     if end_callback:
         end_callback()
 
+    return audio
+
+
+def standard_recognize(
+    microphone: sr.Microphone,
+    recognizer: sr.Recognizer,
+    timeout: typing.Optional[int],
+    start_callback: typing.Optional[typing.Callable[[], None]] = None,
+    end_callback: typing.Optional[typing.Callable[[], None]] = None,
+    calibrate_seconds: float = 1.0,
+    *,
+    to_lower: bool = True,
+) -> typing.Optional[str]:
+    audio = standard_listen(microphone, recognizer, timeout, start_callback, end_callback, calibrate_seconds)
+    if audio is None:
+        return None
+
     try:
         speech = transcribe_audio(audio)
     except Exception as e:
@@ -102,7 +121,9 @@ class VoiceManager:
             logger.warning(f"Voice control disabled (no usable microphone): {e}")
 
         self.recognizer.pause_threshold = 1
-        self.loop_pause = 0.1
+        # Set once the ambient noise level is known (a full calibration ran,
+        # or a previous process handed its threshold over).
+        self.calibrated = False
 
         self.trigger_models = {}
         self.phrase_mapping = {}
@@ -113,6 +134,22 @@ class VoiceManager:
         self.microphone_lock = threading.Lock()
         self.process_thread = None
 
+    # Ambient-noise calibration before each utterance: the first one measures
+    # from scratch; later ones only nudge the known threshold.
+    FULL_CALIBRATION_SECONDS = 1.0
+    QUICK_CALIBRATION_SECONDS = 0.3
+
+    def next_calibration_seconds(self) -> float:
+        if self.calibrated:
+            return self.QUICK_CALIBRATION_SECONDS
+        self.calibrated = True
+        return self.FULL_CALIBRATION_SECONDS
+
+    def adopt_energy_threshold(self, threshold: typing.Optional[float]) -> None:
+        if threshold:
+            self.recognizer.energy_threshold = float(threshold)
+            self.calibrated = True
+
     @staticmethod
     def _find_input_device():
         """PyAudio index of a usable input device, or None.
@@ -157,38 +194,41 @@ class VoiceManager:
             self.phrase_mapping[p.lower()] = phrase_id
 
     def _process_commands(self):
+        # Blocks on the queue between commands instead of polling it, so an
+        # idle frame costs no wakeups here; stop() unblocks it with None.
         while self.running:
-            while not self.command_queue.empty():
-                cmd_id, speech = self.command_queue.get()
-                model = self.trigger_models.get(cmd_id)
-                if model is None:
-                    continue
-                callback = model["callback"]
-                wait_end_callback = model["wait_end_callback"]
-
-                if model["modal"]:
-                    # Own the mic for the whole modal interaction; always clear
-                    # the modal flag even if the callback raises, or voice would
-                    # be stuck "busy" forever.
-                    self.modal = True
-                    try:
-                        with self.microphone_lock:
-                            if wait_end_callback:
-                                wait_end_callback()
-                            callback(speech, self.microphone, self.recognizer)
-                            self.command_queue.queue.clear()
-                    except Exception as e:
-                        logger.exception(f"Voice command failed: {e}")
-                    finally:
-                        self.modal = False
-                else:
-                    try:
+            command = self.command_queue.get()
+            if command is None:
+                break
+            cmd_id, speech = command
+            model = self.trigger_models.get(cmd_id)
+            if model is None:
+                continue
+            callback = model["callback"]
+            wait_end_callback = model["wait_end_callback"]
+
+            if model["modal"]:
+                # Own the mic for the whole modal interaction; always clear
+                # the modal flag even if the callback raises, or voice would
+                # be stuck "busy" forever.
+                self.modal = True
+                try:
+                    with self.microphone_lock:
                         if wait_end_callback:
                             wait_end_callback()
-                        callback(speech)
-                    except Exception as e:
-                        logger.exception(f"Voice command failed: {e}")
-            time.sleep(self.loop_pause)
+                        callback(speech, self.microphone, self.recognizer)
+                        self.command_queue.queue.clear()
+                except Exception as e:
+                    logger.exception(f"Voice command failed: {e}")
+                finally:
+                    self.modal = False
+            else:
+                try:
+                    if wait_end_callback:
+                        wait_end_callback()
+                    callback(speech)
+                except Exception as e:
+                    logger.exception(f"Voice command failed: {e}")
 
     def start(self):
         if not self.available:
@@ -203,6 +243,7 @@ class VoiceManager:
             return
         self.running = False
         self.modal = False
+        self.command_queue.put(None)
         # Daemon thread; bound the wait so shutdown/restart can't hang behind an
         # in-flight generation (which can take minutes).
         if self.process_thread is not None:
@@ -1,11 +1,20 @@
+import base64
+import json
+import typing
+
 import requests
 
-from utils import get_openai_key
+import timing
+from utils import get_openai_key, get_openai_url
 
 # A small, current chat model is plenty for turning a spoken idea into a vivid
 # art-direction sentence. gpt-image-2 follows natural language well, so we no
 # longer emit Stable-Diffusion-style comma "soup".
 PROMPT_MODEL = "gpt-4o-mini"
+# Audio-capable chat model for the single-pass mode: it hears the clip and
+# returns the transcript and the rewritten prompt in one round trip, replacing
+# the separate whisper-1 transcription call.
+AUDIO_PROMPT_MODEL = "gpt-4o-audio-preview"
 
 SYSTEM_PROMPT = (
     "You are an art director who expands a short spoken idea into a single vivid, "
@@ -41,6 +50,25 @@ Guidelines:
 
 Idea: '{idea}'"""
 
+# Single-pass rewrite — the model hears the spoken idea itself. {directive_line}
+# is the style directive (or the neutral medium/style line for "plain").
+AUDIO_USER_TEMPLATE = """The attached audio clip is a short spoken idea for an image.
+
+1. Transcribe exactly what was said.
+2. Turn the idea into ONE image prompt for gpt-image-2.
+
+Guidelines for the prompt:
+- Keep the idea's exact subject and every specific detail it names (objects, counts, colors, actions, relationships). These are hard requirements: never omit, swap, generalize, or invent over them — build the scene around them.
+- If the speaker ends with "title ...", those trailing words are the image's title, not part of the idea.
+- Write 1-3 sentences of natural language (NOT a comma-separated tag list).
+- Describe the subject, setting, composition, lighting, color palette, and mood.
+- {directive_line}
+- Be concrete and evocative; avoid brand names, real public figures, embedded text, and watermarks.
+
+Reply with ONLY a JSON object with two string fields, "transcript" and "prompt"."""
+
+AUDIO_NEUTRAL_DIRECTIVE = "Describe a fitting artistic medium/style, honoring any the speaker names."
+
 STYLE_PLAIN = "plain"
 
 # Style presets for the NEW style picker. Each entry's `directive` is injected
@@ -95,19 +123,55 @@ STYLE_ORDER = [
 ]
 
 
-def speech_to_prompt(short_idea: str, style: str = STYLE_PLAIN) -> str:
+def _style_directive(style: str) -> typing.Optional[str]:
     preset = STYLE_PRESETS.get(style) or STYLE_PRESETS[STYLE_PLAIN]
-    directive = preset.get("directive")
+    return preset.get("directive")
+
+
+def _chat_headers() -> dict:
+    return {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {get_openai_key()}"
+    }
+
+
+def _read_stream(response: requests.Response, on_text: typing.Callable[[str], None]) -> str:
+    """Accumulate a server-sent-events chat completion, reporting the text so far."""
+    chunks = []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            break
+        event = json.loads(payload)
+        if "error" in event:
+            raise RuntimeError(f"Prompt generation stream error: {event['error']}")
+        choices = event.get("choices") or []
+        delta = choices[0].get("delta", {}).get("content") if choices else None
+        if delta:
+            chunks.append(delta)
+            on_text("".join(chunks))
+    return "".join(chunks)
+
+
+def speech_to_prompt(
+    short_idea: str,
+    style: str = STYLE_PLAIN,
+    on_text: typing.Optional[typing.Callable[[str], None]] = None,
+) -> str:
+    """Rewrite a spoken idea into an image prompt.
+
+    With `on_text`, the completion is streamed and `on_text` is called with the
+    accumulated text as tokens arrive (on the calling thread); the full prompt
+    is still returned once the stream ends.
+    """
+    directive = _style_directive(style)
     if directive:
         user_content = USER_TEMPLATE_STYLED.format(idea=short_idea, directive=directive)
     else:
         user_content = USER_TEMPLATE.format(idea=short_idea)
 
-    url = "https://api.openai.com/v1/chat/completions"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {get_openai_key()}"
-    }
     messages = [
         {"role": "system", "content": SYSTEM_PROMPT},
         {"role": "user", "content": user_content},
@@ -120,15 +184,77 @@ def speech_to_prompt(short_idea: str, style: str = STYLE_PLAIN) -> str:
         # Lower than a typical "be creative" setting: the rewrite should enrich
         # the idea, not drift off it and lose the user's named subject.
         "temperature": 0.6,
+        "stream": on_text is not None,
     }
 
-    response = requests.post(url, headers=headers, json=data, timeout=60)
-    if response.status_code == 200:
-        response_data = response.json()
-        generated_text = response_data["choices"][0]["message"]["content"]
-        return generated_text.strip()
-    else:
-        raise RuntimeError(f"Prompt generation {response.status_code}: {response.text.strip()}")
+    with timing.span("prompt"):
+        response = requests.post(
+            get_openai_url("chat/completions"), headers=_chat_headers(), json=data,
+            timeout=60, stream=on_text is not None,
+        )
+        with response:
+            if response.status_code != 200:
+                raise RuntimeError(f"Prompt generation {response.status_code}: {response.text.strip()}")
+            if on_text is not None:
+                generated_text = _read_stream(response, on_text)
+            else:
+                generated_text = response.json()["choices"][0]["message"]["content"]
+    generated_text = generated_text.strip()
+    if not generated_text:
+        raise RuntimeError("Prompt generation returned no text")
+    return generated_text
+
+
+def _parse_audio_reply(content: str) -> typing.Tuple[str, str]:
+    text = content.strip()
+    # Some models wrap JSON in a ```json fence despite being told not to.
+    if text.startswith("```"):
+        text = text.strip("`")
+        if text.lower().startswith("json"):
+            text = text[4:]
+    try:
+        reply = json.loads(text)
+        transcript = str(reply["transcript"]).strip()
+        prompt = str(reply["prompt"]).strip()
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        raise RuntimeError(f"Unexpected single-pass reply ({e}): {content.strip()[:200]}")
+    return transcript, prompt
+
+
+def audio_to_prompt(wav_data: bytes, style: str = STYLE_PLAIN) -> typing.Tuple[str, str]:
+    """Single-pass speech -> prompt: send the WAV clip straight to an
+    audio-capable chat model and get back ``(transcript, prompt)``.
+
+    Saves the separate transcription round trip that `speech_to_prompt` needs.
+    The transcript is still returned so the caller can derive the title and
+    honor the `verbose` keyword.
+    """
+    directive = _style_directive(style) or AUDIO_NEUTRAL_DIRECTIVE
+    user_content = [
+        {"type": "text", "text": AUDIO_USER_TEMPLATE.format(directive_line=directive)},
+        {
+            "type": "input_audio",
+            "input_audio": {"data": base64.b64encode(wav_data).decode("ascii"), "format": "wav"},
+        },
+    ]
+    data = {
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_content},
+        ],
+        "model": AUDIO_PROMPT_MODEL,
+        "modalities": ["text"],
+        "max_tokens": 800,
+        "n": 1,
+        "temperature": 0.6,
+    }
+
+    # Transcription and rewrite in one round trip, so one "prompt" stage.
+    with timing.span("prompt"):
+        response = requests.post(get_openai_url("chat/completions"), headers=_chat_headers(), json=data, timeout=90)
+    if response.status_code != 200:
+        raise RuntimeError(f"Single-pass prompt {response.status_code}: {response.text.strip()}")
+    return _parse_audio_reply(response.json()["choices"][0]["message"]["content"])
 
 
 if __name__ == "__main__":
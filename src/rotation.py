@@ -0,0 +1,285 @@
+"""Slideshow rotation: which image to show next, and when.
+
+The engine keeps the record uuids in a playlist (oldest first) with a
+uuid -> position index, so picking the next image is O(1) instead of
+reloading records.json and scanning it on every tick. Records are added and
+removed incrementally as uploads/generations/deletions happen.
+
+Shuffle mode draws from a shuffle-bag: every image is shown once per cycle
+before any repeats, and a new cycle never starts with the image just shown.
+The cursor (last image picked) and the remaining bag live in StateManager so
+a restart resumes the cycle instead of starting over.
+
+Weighted mode samples from an alias table (Vose), so each pick is O(1).
+Weights favour favorites, recent images and images shown less than average;
+a Schedule can narrow the pool to one style per part of the day. Tables are
+built lazily per style and rebuilt after the pool changes or once a full
+pool's worth of picks has drifted the show counts, which keeps the O(n)
+build amortized to O(1) per pick.
+"""
+import datetime
+import logging
+import random
+import typing
+
+logger = logging.getLogger(__name__)
+
+MODE_SEQUENTIAL = "sequential"
+MODE_SHUFFLE = "shuffle"
+MODE_NEWEST = "newest"
+MODE_WEIGHTED = "weighted"
+
+STATE_CURSOR = "rotation_cursor"
+STATE_BAG = "rotation_bag"
+STATE_SHOWS = "rotation_shows"
+
+# (name, first hour, end hour); night wraps past midnight.
+DAY_PARTS = (
+    ("morning", 6, 12),
+    ("afternoon", 12, 18),
+    ("evening", 18, 22),
+    ("night", 22, 6),
+)
+ANY_STYLE = "any"
+
+
+def _in_hours(hour: int, start: int, end: int) -> bool:
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+class Schedule:
+    """Time-of-day rules on top of the rotation timer.
+
+    `quiet_start`/`quiet_end` are hours (0-23); rotation stops from the start
+    hour until the end hour, and equal values disable quiet hours.
+    `styles` maps a DAY_PARTS name to the style shown then (ANY_STYLE/None for
+    no restriction).
+    """
+
+    def __init__(self, quiet_start: int = 0, quiet_end: int = 0,
+                 styles: typing.Optional[typing.Dict[str, str]] = None) -> None:
+        self.quiet_start = quiet_start
+        self.quiet_end = quiet_end
+        self.styles = styles or {}
+
+    def is_quiet(self, now: typing.Optional[datetime.datetime] = None) -> bool:
+        if self.quiet_start == self.quiet_end:
+            return False
+        now = now or datetime.datetime.now()
+        return _in_hours(now.hour, self.quiet_start, self.quiet_end)
+
+    def style_at(self, now: typing.Optional[datetime.datetime] = None) -> typing.Optional[str]:
+        now = now or datetime.datetime.now()
+        for name, start, end in DAY_PARTS:
+            if _in_hours(now.hour, start, end):
+                style = self.styles.get(name)
+                return None if style in (None, ANY_STYLE) else style
+        return None
+
+
+class AliasTable:
+    """O(1) sampling from a fixed discrete distribution (Vose's alias method)."""
+
+    def __init__(self, items: typing.Sequence[str], weights: typing.Sequence[float]) -> None:
+        n = len(items)
+        self.items = list(items)
+        self._prob = [0.0] * n
+        self._alias = [0] * n
+        total = float(sum(weights))
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self._prob[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in small + large:
+            self._prob[i] = 1.0
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def sample(self) -> str:
+        i = random.randrange(len(self.items))
+        return self.items[i] if random.random() < self._prob[i] else self.items[self._alias[i]]
+
+
+class RotationEngine:
+    FAVORITE_WEIGHT = 3.0
+    # Extra weight for new images, halving every RECENCY_HALF_LIFE_DAYS.
+    RECENCY_BOOST = 1.0
+    RECENCY_HALF_LIFE_DAYS = 14
+
+    def __init__(self, state_manager=None, mode: str = MODE_SEQUENTIAL) -> None:
+        self.state_manager = state_manager
+        self.mode = mode
+        self._playlist: typing.List[str] = []
+        self._position: typing.Dict[str, int] = {}
+        self._records: typing.Dict[str, typing.Any] = {}
+        self._bag: typing.List[str] = []
+        self._cursor: typing.Optional[str] = None
+        self._shows: typing.Dict[str, int] = {}
+        # sum(self._shows.values()), kept up to date as counts change.
+        self._total_shows = 0
+        self._tables: typing.Dict[typing.Optional[str], typing.Optional[AliasTable]] = {}
+        self._picks_since_build = 0
+
+    def __len__(self) -> int:
+        return len(self._playlist)
+
+    def __contains__(self, uuid: str) -> bool:
+        return uuid in self._position
+
+    def load(self, records: typing.Iterable[typing.Any]) -> None:
+        """Build the playlist from ImageRecords (oldest first) and restore the
+        persisted cursor/bag/show counts, dropping entries whose records are gone."""
+        self._records = {record.uuid: record for record in records}
+        self._playlist = list(self._records)
+        self._position = {uuid: i for i, uuid in enumerate(self._playlist)}
+        self._tables.clear()
+        if self.state_manager is not None:
+            cursor = self.state_manager.get(STATE_CURSOR)
+            self._cursor = cursor if cursor in self._position else None
+            self._bag = [u for u in self.state_manager.get(STATE_BAG, []) if u in self._position]
+            shows = self.state_manager.get(STATE_SHOWS, {})
+            self._shows = {u: n for u, n in shows.items() if u in self._position}
+            # The shows and the bag change on every pick; copying them into
+            # the state store each time would cost O(n) per tick, so the store
+            # reads them only when it writes state.json. dict()/list() copies
+            # are atomic under the GIL, so that is safe from its flush thread.
+            self.state_manager.bind(STATE_SHOWS, lambda: dict(self._shows))
+            self.state_manager.bind(STATE_BAG, lambda: list(self._bag))
+        self._total_shows = sum(self._shows.values())
+
+    def set_mode(self, mode: str) -> None:
+        self.mode = mode
+
+    def add(self, record) -> None:
+        """Append a new (newest) record."""
+        if record.uuid in self._position:
+            return
+        self._records[record.uuid] = record
+        self._position[record.uuid] = len(self._playlist)
+        self._playlist.append(record.uuid)
+        if self._bag:
+            # Join the current shuffle cycle at a random spot.
+            self._bag.insert(random.randint(0, len(self._bag)), record.uuid)
+        self._tables.clear()
+
+    def update(self, record) -> None:
+        """A record's metadata (e.g. favorite) changed."""
+        if record.uuid in self._position:
+            self._records[record.uuid] = record
+            self._tables.clear()
+
+    def remove(self, uuid: str) -> None:
+        # Deletions are rare, so re-indexing the tail here keeps next() O(1).
+        idx = self._position.pop(uuid, None)
+        if idx is None:
+            return
+        del self._playlist[idx]
+        for i in range(idx, len(self._playlist)):
+            self._position[self._playlist[i]] = i
+        self._records.pop(uuid, None)
+        self._total_shows -= self._shows.pop(uuid, 0)
+        self._tables.clear()
+        if self._cursor == uuid:
+            # Keep the sequence going from the record that took its place.
+            self._cursor = self._playlist[idx - 1] if idx > 0 and self._playlist else None
+        # The bag is filtered lazily in _next_shuffled().
+
+    def next(self, current: typing.Optional[str] = None,
+             style: typing.Optional[str] = None) -> typing.Optional[str]:
+        """Pick the image to show after `current` (or after the saved cursor).
+
+        `style` restricts weighted picks to that style; if no image has it the
+        whole playlist is used.
+        """
+        if not self._playlist:
+            return None
+        if current in self._position:
+            self._cursor = current
+        if self.mode == MODE_WEIGHTED:
+            uuid = self._next_weighted(style)
+        elif self.mode == MODE_SHUFFLE:
+            uuid = self._next_shuffled()
+        else:
+            step = -1 if self.mode == MODE_NEWEST else 1
+            if self._cursor in self._position:
+                uuid = self._playlist[(self._position[self._cursor] + step) % len(self._playlist)]
+            else:
+                uuid = self._playlist[-1 if step < 0 else 0]
+        self._cursor = uuid
+        self._shows[uuid] = self._shows.get(uuid, 0) + 1
+        self._total_shows += 1
+        self._persist()
+        return uuid
+
+    def _next_shuffled(self) -> str:
+        while self._bag:
+            uuid = self._bag.pop()
+            if uuid in self._position and uuid != self._cursor:
+                return uuid
+        self._bag = list(self._playlist)
+        random.shuffle(self._bag)
+        # Don't open a new cycle with the image that is on screen now.
+        if len(self._bag) > 1 and self._bag[-1] == self._cursor:
+            self._bag[0], self._bag[-1] = self._bag[-1], self._bag[0]
+        return self._bag.pop()
+
+    def _next_weighted(self, style: typing.Optional[str]) -> str:
+        self._picks_since_build += 1
+        if self._picks_since_build >= len(self._playlist):
+            # Show counts have moved enough to matter; rebuild on demand.
+            self._tables.clear()
+        table = self._table_for(style) or self._table_for(None)
+        uuid = table.sample()
+        # A couple of redraws avoid showing the same image twice in a row.
+        for _ in range(3):
+            if uuid != self._cursor or len(table) < 2:
+                break
+            uuid = table.sample()
+        return uuid
+
+    def _table_for(self, style: typing.Optional[str]) -> typing.Optional[AliasTable]:
+        if style not in self._tables:
+            pool = [u for u in self._playlist if style is None or self._records[u].style == style]
+            if pool:
+                mean_shows = self._total_shows / len(self._playlist)
+                today = datetime.date.today()
+                self._tables[style] = AliasTable(pool, [self._weight(u, mean_shows, today) for u in pool])
+            else:
+                self._tables[style] = None
+            self._picks_since_build = 0
+        return self._tables[style]
+
+    def _weight(self, uuid: str, mean_shows: float, today: datetime.date) -> float:
+        record = self._records[uuid]
+        weight = self.FAVORITE_WEIGHT if record.favorite else 1.0
+        if record.date is not None:
+            age_days = max(0, (today - record.date).days)
+            weight *= 1.0 + self.RECENCY_BOOST * 0.5 ** (age_days / self.RECENCY_HALF_LIFE_DAYS)
+        # Under-shown images catch up: weight ~ (mean shows + 1) / (shows + 1).
+        return weight * (mean_shows + 1.0) / (self._shows.get(uuid, 0) + 1.0)
+
+    def _persist(self) -> None:
+        if self.state_manager is not None:
+            # O(1) per tick: the cursor is a single value, and the bound shows
+            # and bag are only read when state.json is written (see load()).
+            self.state_manager.set(STATE_CURSOR, self._cursor)
+            self.state_manager.touch()
+
+
+if __name__ == "__main__":
+    from types import SimpleNamespace
+
+    records = [SimpleNamespace(uuid=str(i), style="watercolor" if i % 2 else None,
+                               favorite=i == 3, date=datetime.date.today()) for i in range(6)]
+    engine = RotationEngine(mode=MODE_WEIGHTED)
+    engine.load(records)
+    print([engine.next() for _ in range(12)])
+    print([engine.next(style="watercolor") for _ in range(6)])
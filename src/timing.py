@@ -0,0 +1,107 @@
+"""Per-stage timings for one job (a NEW generation, a boot).
+
+A Trace collects how long each named stage took. While a trace is active on
+a thread, the module-level span() times a stage into it, so voice_manager,
+prompt, generator and ImageManager can report their stages without a trace
+being passed through every call; with no active trace span() does nothing.
+
+Finished traces are logged as one JSON object per line to the "timings"
+logger, which logging_config writes to logs/timings.jsonl:
+
+    {"kind": "new", "id": "...", "started": 1760000000.0, "outcome": "ok",
+     "total": 41.2, "stages": {"calibrate": 0.3, "listen": 6.1, ...}, ...}
+"""
+import contextlib
+import json
+import logging
+import threading
+import time
+import typing
+import uuid
+
+logger = logging.getLogger(__name__)
+# Machine-readable lines only; see logging_config.setup_logging.
+json_logger = logging.getLogger("timings")
+
+_local = threading.local()
+
+
+class Trace:
+    def __init__(self, kind: str, start: typing.Optional[float] = None, **fields) -> None:
+        """`start` is a time.perf_counter() value (default: now); `fields`
+        are extra keys for the JSON line (e.g. the style)."""
+        self.kind = kind
+        self.id = uuid.uuid4().hex[:12]
+        self.fields = dict(fields)
+        self.stages: typing.Dict[str, float] = {}
+        self._start = self._last_mark = start if start is not None else time.perf_counter()
+        self.started = time.time() - (time.perf_counter() - self._start)
+
+    def add(self, stage: str, seconds: float) -> None:
+        # A stage that runs more than once (e.g. a retry) accumulates.
+        self.stages[stage] = round(self.stages.get(stage, 0.0) + seconds, 3)
+
+    @contextlib.contextmanager
+    def span(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def mark(self, stage: str) -> None:
+        """Close `stage` as everything since the previous mark (or the start)."""
+        now = time.perf_counter()
+        self.add(stage, now - self._last_mark)
+        self._last_mark = now
+
+    def finish(self, outcome: str = "ok", **fields) -> dict:
+        """Log the trace (one summary line plus the JSON line) and return the entry."""
+        total = time.perf_counter() - self._start
+        entry = {
+            "kind": self.kind,
+            "id": self.id,
+            "started": round(self.started, 3),
+            "outcome": outcome,
+            "total": round(total, 3),
+            "stages": dict(self.stages),
+            **self.fields,
+            **fields,
+        }
+        summary = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in self.stages.items())
+        logger.info(f"{self.kind} {outcome}: {summary} (total {total:.2f}s)")
+        json_logger.info(json.dumps(entry, default=str))
+        return entry
+
+
+def current() -> typing.Optional[Trace]:
+    """The trace active on this thread, if any."""
+    return getattr(_local, "trace", None)
+
+
+@contextlib.contextmanager
+def activate(trace: Trace):
+    """Make `trace` the target of span() on this thread for the block."""
+    previous = current()
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
+
+
+@contextlib.contextmanager
+def span(stage: str):
+    """Time `stage` into the active trace (no-op without one)."""
+    trace = current()
+    if trace is None:
+        yield
+        return
+    with trace.span(stage):
+        yield
+
+
+def stages() -> typing.Optional[typing.Dict[str, float]]:
+    """A copy of the active trace's stages so far (None without a trace)."""
+    trace = current()
+    return dict(trace.stages) if trace is not None else None
@@ -2,7 +2,8 @@ import os
 import re
 
 from datetime import date
-from PIL import Image
+
+OPENAI_API_BASE = "https://api.openai.com/v1"
 
 def get_openai_key():
     file_path = os.path.join(os.path.dirname(__file__), '..', 'key.secret')
@@ -10,24 +11,22 @@ def get_openai_key():
         api_key = f.read().strip()
     return api_key
 
-def fit_image(image, width, height, background=(0, 0, 0)):
-    """Scale `image` to fit within (width, height) preserving its aspect ratio,
-    centered on a solid `background` (letterbox). Returns an RGB image exactly
-    (width, height) in size, so the source is never stretched/distorted."""
-    src_w, src_h = image.size
-    scale = min(width / src_w, height / src_h)
-    new_w = max(1, round(src_w * scale))
-    new_h = max(1, round(src_h * scale))
-    fitted = image.resize((new_w, new_h), Image.LANCZOS)
-
-    canvas = Image.new("RGB", (width, height), background)
-    offset = ((width - new_w) // 2, (height - new_h) // 2)
-    if fitted.mode in ("RGBA", "LA", "P"):
-        fitted = fitted.convert("RGBA")
-        canvas.paste(fitted, offset, fitted)
-    else:
-        canvas.paste(fitted, offset)
-    return canvas
+def get_openai_url(path: str) -> str:
+    """Full URL of an OpenAI endpoint, e.g. get_openai_url("chat/completions").
+
+    The base can be overridden with the OPENAI_BASE_URL environment variable so
+    the frame can be pointed at a local stand-in server while testing.
+    """
+    base = os.environ.get("OPENAI_BASE_URL") or OPENAI_API_BASE
+    return base.rstrip("/") + "/" + path.lstrip("/")
+
+def process_rss_bytes() -> int:
+    """Resident memory of this process in bytes (Linux; 0 where unknown)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0
 
 def date_serializer(obj):
     if isinstance(obj, date):
@@ -0,0 +1,98 @@
+import logging
+import queue
+import socket
+import threading
+
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+logger = logging.getLogger(__name__)
+
+
+class _RequestHandler(WSGIRequestHandler):
+    # Overridden per server (see PooledWSGIServer): socket read timeout, so a
+    # slow or stalled client can't pin a worker thread indefinitely.
+    timeout = 30
+
+    def log_message(self, format, *args):
+        # wsgiref prints every request to stderr; route it to debug logging.
+        logger.debug("%s - %s", self.client_address[0], format % args)
+
+
+class PooledWSGIServer(WSGIServer):
+    """Stdlib WSGI server whose connections are served by a fixed thread pool.
+
+    Unlike Flask's development server (a new thread per connection), at most
+    `workers` requests run at once and at most `max_queue` accepted connections
+    wait for a worker; beyond that a client gets an immediate 503 instead of
+    another thread. Responses are HTTP/1.0 (no keep-alive), so idle sockets
+    never hold a worker, and every socket read is bounded by `request_timeout`.
+    """
+
+    request_queue_size = 16  # listen() backlog
+
+    def __init__(self, address, app, workers: int = 4, max_queue: int = 16, request_timeout: float = 30):
+        handler = type("RequestHandler", (_RequestHandler,), {"timeout": request_timeout})
+        super().__init__(address, handler)
+        self.set_app(app)
+
+        self._pending = queue.Queue(max_queue)
+        self._workers = [
+            threading.Thread(target=self._work, name=f"http-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def process_request(self, request, client_address):
+        # Called on the accept thread: hand off, or shed load when saturated.
+        try:
+            self._pending.put_nowait((request, client_address))
+        except queue.Full:
+            logger.warning(f"HTTP queue full; rejecting {client_address[0]}")
+            self._reject(request)
+
+    def _reject(self, request):
+        try:
+            request.settimeout(1)
+            request.sendall(
+                b"HTTP/1.0 503 Service Unavailable\r\n"
+                b"Retry-After: 2\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+            )
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def _work(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except (socket.timeout, ConnectionError):
+                pass
+            except Exception:
+                logger.exception(f"HTTP request from {client_address[0]} failed")
+            finally:
+                self.shutdown_request(request)
+
+    def stop(self, timeout: float = 5) -> None:
+        """Stop accepting, let in-flight requests finish (up to `timeout` s), close.
+
+        Must be called from a thread other than the one in serve_forever().
+        """
+        self.shutdown()
+        # Connections still waiting for a worker are dropped, not served.
+        while True:
+            try:
+                request, _ = self._pending.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                self.shutdown_request(request)
+        for _ in self._workers:
+            self._pending.put(None)
+        for worker in self._workers:
+            worker.join(timeout=timeout / max(1, len(self._workers)))
+        self.server_close()
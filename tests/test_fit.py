@@ -0,0 +1,74 @@
+"""fit_image: fast path, letterboxing, and a per-tier benchmark."""
+import time
+
+import pytest
+from PIL import Image
+
+import imaging
+
+
+def _legacy_fit(image, width, height):
+    """The old path: full-resolution LANCZOS plus a canvas paste, always."""
+    src_w, src_h = image.size
+    scale = min(width / src_w, height / src_h)
+    new_w, new_h = max(1, round(src_w * scale)), max(1, round(src_h * scale))
+    fitted = image.resize((new_w, new_h), Image.LANCZOS)
+    canvas = Image.new("RGB", (width, height))
+    canvas.paste(fitted, ((width - new_w) // 2, (height - new_h) // 2))
+    return canvas
+
+
+def _best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@pytest.mark.parametrize("quality", [imaging.QUALITY_FAST, imaging.QUALITY_FINAL])
+def test_matching_aspect_fills_the_frame(quality):
+    source = Image.new("RGB", (1152, 2048), (10, 120, 200))
+    fitted = imaging.fit_image(source, 1080, 1920, quality=quality)
+    assert fitted.size == (1080, 1920) and fitted.mode == "RGB"
+    # No letterbox: the corners are picture, not background.
+    assert fitted.getpixel((0, 0)) == (10, 120, 200)
+
+
+def test_same_size_is_returned_untouched():
+    source = Image.new("RGB", (1080, 1920))
+    assert imaging.fit_image(source, 1080, 1920) is source
+
+
+def test_other_aspect_is_letterboxed():
+    source = Image.new("RGB", (2048, 1536), (255, 255, 255))
+    fitted = imaging.fit_image(source, 1080, 1920, background=(0, 0, 0))
+    assert fitted.size == (1080, 1920)
+    assert fitted.getpixel((540, 0)) == (0, 0, 0)
+    assert fitted.getpixel((540, 960)) == (255, 255, 255)
+
+
+def test_transparency_is_composited_on_the_background():
+    source = Image.new("RGBA", (100, 100), (255, 0, 0, 0))
+    fitted = imaging.fit_image(source, 50, 50, background=(1, 2, 3))
+    assert fitted.mode == "RGB" and fitted.getpixel((25, 25)) == (1, 2, 3)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("src_size, target", [
+    ((1152, 2048), (1080, 1920)),  # generated image -> frame
+    ((2048, 1536), (1080, 1920)),  # landscape upload -> frame
+    ((1152, 2048), (300, 533)),    # generated image -> gallery tile
+])
+def test_tier_benchmark(src_size, target):
+    source = Image.effect_noise(src_size, 64).convert("RGB")
+    legacy = _best_of(lambda: _legacy_fit(source, *target))
+    final = _best_of(lambda: imaging.fit_image(source, *target, quality=imaging.QUALITY_FINAL))
+    fast = _best_of(lambda: imaging.fit_image(source, *target, quality=imaging.QUALITY_FAST))
+    print(f"\n{src_size} -> {target}: legacy {legacy * 1000:.1f} ms | "
+          f"final {final * 1000:.1f} ms | fast {fast * 1000:.1f} ms")
+    # Opt-in only (`pytest -m benchmark -s`): wall-clock bounds would flake
+    # in the default run on a loaded Pi or CI box.
+    assert final <= legacy * 1.5
+    assert fast <= final * 1.5
@@ -0,0 +1,94 @@
+"""ImagingService: pool results, async delivery and error handling."""
+import multiprocessing
+import os
+import threading
+
+import pytest
+from PIL import Image
+
+import imaging
+
+
+def _fail_with_pid():
+    raise RuntimeError(os.getpid())
+
+
+@pytest.fixture(scope="module")
+def service():
+    service = imaging.ImagingService(workers=2)
+    yield service
+    service.shutdown()
+
+
+@pytest.fixture
+def png(tmp_path):
+    path = str(tmp_path / "frame.png")
+    Image.new("RGB", (1152, 2048), (200, 40, 40)).save(path)
+    return path
+
+
+def test_fit_file_runs_on_pool(service, png):
+    image = service.fit_file(png, 270, 480)
+    assert image.size == (270, 480)
+    assert image.getpixel((135, 240)) == (200, 40, 40)
+
+
+def test_worker_errors_are_not_rerun_inline(service):
+    with pytest.raises(RuntimeError) as raised:
+        service._run(_fail_with_pid)
+    # Raised in a worker process, not by a second inline attempt here.
+    assert raised.value.args[0] != os.getpid()
+
+
+def test_fit_file_async_delivers_off_the_calling_thread(service, png):
+    done = threading.Event()
+    results = []
+
+    def on_done(image, error):
+        results.append((image, error, threading.current_thread()))
+        done.set()
+
+    service.fit_file_async(png, 270, 480, on_done)
+    assert done.wait(30)
+    image, error, thread = results[0]
+    assert error is None and image.size == (270, 480)
+    assert thread is not threading.current_thread()
+
+
+def test_fit_file_async_reports_errors(service, tmp_path):
+    done = threading.Event()
+    results = []
+    service.fit_file_async(str(tmp_path / "missing.png"), 270, 480,
+                           lambda image, error: (results.append((image, error)), done.set()))
+    assert done.wait(30)
+    image, error = results[0]
+    assert image is None and isinstance(error, FileNotFoundError)
+
+
+def _fit_in_daemon(path, results):
+    try:
+        service = imaging.ImagingService(workers=1)
+        results.put((service.fit_file(path, 27, 48).size, service.decode_upload(path).size,
+                     service._executor is None))
+    except BaseException as e:
+        results.put(repr(e))
+
+
+def test_work_runs_inline_in_a_daemonic_process(png):
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    child = ctx.Process(target=_fit_in_daemon, args=(png, results), daemon=True)
+    child.start()
+    try:
+        outcome = results.get(timeout=60)
+    finally:
+        child.join(10)
+    assert outcome == ((27, 48), (1152, 2048), True)
+
+
+def test_run_inline_never_starts_a_pool(png, monkeypatch):
+    monkeypatch.setattr(imaging, "_service", None)
+    imaging.run_inline()
+    service = imaging.get_service()
+    assert service.fit_file(png, 27, 48).size == (27, 48)
+    assert service._executor is None
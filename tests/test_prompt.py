@@ -0,0 +1,66 @@
+"""Single-pass speech -> prompt against a local stand-in for the OpenAI API."""
+import base64
+import http.server
+import json
+import threading
+
+import pytest
+
+import prompt
+
+
+class _StandIn(http.server.BaseHTTPRequestHandler):
+    reply = None  # chat message content returned to the client
+    requests = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).requests.append((self.path, body))
+        payload = json.dumps({"choices": [{"message": {"content": type(self).reply}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    _StandIn.requests = []
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+    monkeypatch.setattr(prompt, "get_openai_key", lambda: "test-key")
+    yield _StandIn
+    server.shutdown()
+    server.server_close()
+
+
+def test_audio_to_prompt_single_round_trip(stand_in):
+    stand_in.reply = json.dumps({"transcript": "A red fox", "prompt": "A red fox in fresh snow"})
+
+    transcript, rewritten = prompt.audio_to_prompt(b"RIFF-wav-bytes", style="watercolor")
+
+    assert (transcript, rewritten) == ("A red fox", "A red fox in fresh snow")
+    assert len(stand_in.requests) == 1
+    path, body = stand_in.requests[0]
+    assert path == "/v1/chat/completions"
+    assert body["model"] == prompt.AUDIO_PROMPT_MODEL
+    audio = body["messages"][1]["content"][1]["input_audio"]
+    assert base64.b64decode(audio["data"]) == b"RIFF-wav-bytes"
+
+
+def test_audio_to_prompt_accepts_fenced_json(stand_in):
+    stand_in.reply = '```json\n{"transcript": "moon", "prompt": "A full moon"}\n```'
+
+    assert prompt.audio_to_prompt(b"wav") == ("moon", "A full moon")
+
+
+def test_audio_to_prompt_rejects_free_text(stand_in):
+    stand_in.reply = "Sure! Here is a prompt: a red fox."
+
+    with pytest.raises(RuntimeError):
+        prompt.audio_to_prompt(b"wav")
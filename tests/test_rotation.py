@@ -0,0 +1,60 @@
+"""RotationEngine: cycles, weighted picks and write-behind persistence."""
+import datetime
+import json
+from types import SimpleNamespace
+
+import rotation
+from managers.state_manager import StateManager
+
+
+def _records(n, **fields):
+    today = datetime.date.today()
+    return [SimpleNamespace(uuid=str(i), style=None, favorite=False, date=today, **fields) for i in range(n)]
+
+
+def test_shuffle_shows_every_image_once_per_cycle():
+    engine = rotation.RotationEngine(mode=rotation.MODE_SHUFFLE)
+    engine.load(_records(8))
+    first = [engine.next() for _ in range(8)]
+    second = [engine.next() for _ in range(8)]
+    assert sorted(first) == sorted(second) == [str(i) for i in range(8)]
+    assert first[-1] != second[0]
+
+
+def test_weighted_prefers_favorites_and_respects_style():
+    records = _records(10)
+    records[3].favorite = True
+    for record in records[5:]:
+        record.style = "watercolor"
+    engine = rotation.RotationEngine(mode=rotation.MODE_WEIGHTED)
+    engine.load(records)
+    picks = [engine.next() for _ in range(3000)]
+    assert picks.count("3") > picks.count("4")
+    assert {engine.next(style="watercolor") for _ in range(50)} <= {r.uuid for r in records[5:]}
+
+
+def test_show_counts_stay_consistent_with_removals():
+    engine = rotation.RotationEngine(mode=rotation.MODE_WEIGHTED)
+    engine.load(_records(5))
+    for _ in range(40):
+        engine.next()
+    engine.remove("2")
+    assert engine._total_shows == sum(engine._shows.values())
+
+
+def test_shows_are_written_behind_not_copied_per_tick(tmp_path):
+    state_path = tmp_path / "state.json"
+    state = StateManager(str(state_path))
+    engine = rotation.RotationEngine(state, mode=rotation.MODE_SHUFFLE)
+    engine.load(_records(4))
+    picks = [engine.next() for _ in range(6)]
+    assert not state_path.exists()
+
+    state.flush()
+    saved = json.loads(state_path.read_text())
+    assert saved[rotation.STATE_CURSOR] == picks[-1]
+    assert sum(saved[rotation.STATE_SHOWS].values()) == 6
+
+    resumed = rotation.RotationEngine(StateManager(str(state_path)), mode=rotation.MODE_SHUFFLE)
+    resumed.load(_records(4))
+    assert resumed._bag == engine._bag
@@ -0,0 +1,126 @@
+"""Fetch / stage / switch against a local bare remote."""
+import os
+import subprocess
+import threading
+
+import pytest
+
+from managers import sync_manager
+
+
+def git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def commit_file(repo, rel, text, message):
+    path = os.path.join(repo, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+    git(repo, "add", rel)
+    git(repo, "commit", "-q", "-m", message)
+    return git(repo, "rev-parse", "HEAD")
+
+
+@pytest.fixture
+def repos(tmp_path, monkeypatch):
+    """(frame clone, developer clone, bare remote) sharing one history."""
+    for var in ("GIT_AUTHOR_NAME", "GIT_COMMITTER_NAME"):
+        monkeypatch.setenv(var, "test")
+    for var in ("GIT_AUTHOR_EMAIL", "GIT_COMMITTER_EMAIL"):
+        monkeypatch.setenv(var, "test@example.com")
+    seed = str(tmp_path / "seed")
+    os.makedirs(seed)
+    git(seed, "init", "-q")
+    commit_file(seed, "src/app.py", "VERSION = 1\n", "v1")
+    remote = str(tmp_path / "remote.git")
+    git(str(tmp_path), "clone", "-q", "--bare", seed, remote)
+    frame, dev = str(tmp_path / "frame"), str(tmp_path / "dev")
+    git(str(tmp_path), "clone", "-q", remote, frame)
+    git(str(tmp_path), "clone", "-q", remote, dev)
+    return frame, dev, remote
+
+
+def publish(dev, version):
+    target = commit_file(dev, "src/app.py", f"VERSION = {version}\n", f"v{version}")
+    git(dev, "push", "-q", "origin", "HEAD")
+    return target
+
+
+def test_up_to_date(repos):
+    frame, _, _ = repos
+    assert sync_manager.check_for_update(frame) is None
+
+
+def test_fetch_stage_switch(repos):
+    frame, dev, _ = repos
+    target = publish(dev, 2)
+    with open(os.path.join(frame, "configs.json"), "w") as f:
+        f.write('{"device": "local"}')
+
+    assert sync_manager.check_for_update(frame) == target
+
+    staged = sync_manager.stage_update(target, frame)
+    assert staged["ok"] and not staged["deps_changed"]
+    stage_dir = os.path.join(frame, ".git", sync_manager.STAGE_DIRNAME)
+    with open(os.path.join(stage_dir, "src", "app.py")) as f:
+        assert f.read() == "VERSION = 2\n"
+    # Staging leaves the running tree alone.
+    assert git(frame, "rev-parse", "HEAD") != target
+
+    applied = sync_manager.apply_update(staged, frame)
+    assert applied["ok"] and applied["updated"]
+    assert git(frame, "rev-parse", "HEAD") == target
+    assert not os.path.exists(stage_dir)
+    with open(os.path.join(frame, "configs.json")) as f:
+        assert f.read() == '{"device": "local"}'
+
+
+def test_broken_update_is_not_staged(repos):
+    frame, dev, _ = repos
+    target = commit_file(dev, "src/app.py", "VERSION = (\n", "broken")
+    git(dev, "push", "-q", "origin", "HEAD")
+
+    staged = sync_manager.stage_update(sync_manager.check_for_update(frame), frame)
+    assert not staged["ok"] and "compile" in staged["message"]
+    assert git(frame, "rev-parse", "HEAD") != target
+
+
+def test_sync_switches_to_the_stage_without_fetching(repos):
+    frame, dev, remote = repos
+    target = publish(dev, 2)
+    announced = threading.Event()
+    checker = sync_manager.UpdateChecker(on_update=lambda staged: announced.set(), repo_root=frame)
+    checker.check_now()
+    assert announced.is_set() and checker.staged["target"] == target
+
+    # With the remote gone, a fetch would fail; the switch must not need one.
+    os.rename(remote, remote + ".offline")
+    result = checker.sync()
+    assert result["ok"] and result["updated"]
+    assert git(frame, "rev-parse", "HEAD") == target
+
+
+def test_sync_does_not_wait_for_a_stage_in_progress(repos):
+    frame, _, _ = repos
+    checker = sync_manager.UpdateChecker(repo_root=frame)
+    with checker._stage_lock:
+        result = checker.sync()
+    assert result["ok"] and not result["updated"]
+
+
+def test_failed_fetch_is_reported_not_up_to_date(repos):
+    frame, dev, remote = repos
+    publish(dev, 2)
+    assert sync_manager.stage_update(sync_manager.check_for_update(frame), frame)["ok"]
+    os.rename(remote, remote + ".offline")
+
+    with pytest.raises(sync_manager.FetchError):
+        sync_manager.check_for_update(frame)
+    result = sync_manager.perform_sync(repo_root=frame)
+    assert not result["ok"] and not result["updated"]
+    assert result["message"].startswith("git fetch failed")
+    # The stage survives a failed fetch.
+    assert os.path.exists(os.path.join(frame, ".git", sync_manager.STAGE_DIRNAME))
+
+    sync_manager.UpdateChecker(repo_root=frame).check_now()  # logs, does not raise
@@ -0,0 +1,46 @@
+"""Trace, span() and the JSON line written to logs/timings.jsonl."""
+import json
+import logging
+import threading
+
+import timing
+
+
+def test_span_without_a_trace_is_a_no_op():
+    with timing.span("listen"):
+        pass
+    assert timing.current() is None and timing.stages() is None
+
+
+def test_span_times_into_the_trace_active_on_this_thread():
+    trace = timing.Trace("new")
+
+    def elsewhere():
+        with timing.span("elsewhere"):
+            pass
+
+    with timing.activate(trace):
+        with timing.span("listen"):
+            pass
+        with timing.span("listen"):
+            pass
+        other = threading.Thread(target=elsewhere)
+        other.start()
+        other.join()
+        assert list(timing.stages()) == ["listen"]
+    assert timing.current() is None
+
+
+def test_finish_logs_one_json_line(caplog, monkeypatch):
+    # setup_logging() stops "timings" propagating; caplog listens at the root.
+    monkeypatch.setattr(timing.json_logger, "propagate", True)
+    trace = timing.Trace("new", style="watercolor")
+    trace.add("generate", 1.23456)
+
+    with caplog.at_level(logging.INFO, logger="timings"):
+        entry = trace.finish("ok", uuid="abc")
+
+    lines = [json.loads(r.getMessage()) for r in caplog.records if r.name == "timings"]
+    assert lines == [entry]
+    assert entry["stages"] == {"generate": 1.235}
+    assert (entry["outcome"], entry["style"], entry["uuid"]) == ("ok", "watercolor", "abc")
@@ -0,0 +1,121 @@
+"""UploadServer job tracking, and UploadServerProcess end to end on a local port."""
+import io
+import json
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+import pytest
+from PIL import Image
+
+import imaging
+from managers.upload_manager import UploadServer, UploadServerProcess
+
+
+def jpeg_bytes(size=(1200, 1600)):
+    jpeg = io.BytesIO()
+    Image.new("RGB", size, (30, 90, 200)).save(jpeg, "JPEG")
+    return jpeg.getvalue()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get(url):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return response.status, response.read()
+
+
+def post_file(url, filename, data):
+    boundary = uuid.uuid4().hex
+    body = (f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="images"; filename="{filename}"\r\n'
+            "Content-Type: image/jpeg\r\n\r\n").encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    req = urllib.request.Request(url, data=body, headers={
+        "Content-Type": f"multipart/form-data; boundary={boundary}", "Accept": "application/json"})
+    with urllib.request.urlopen(req, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def test_busy_rejections_do_not_evict_queued_jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(imaging, "_service", imaging.ImagingService(inline=True))
+    release = threading.Event()
+    saved = []
+
+    def on_image(image, title):
+        release.wait(30)
+        saved.append(title)
+
+    spool = tmp_path / "spool"
+    server = UploadServer(on_image, spool_dir=str(spool), workers=1, max_pending=2)
+    server.MAX_TRACKED_JOBS = 3
+    client = server.app.test_client()
+
+    def upload(name):
+        response = client.post("/upload", data={"images": [(io.BytesIO(jpeg_bytes((64, 64))), name)]},
+                               headers={"Accept": "application/json"})
+        return response.get_json()["jobs"][0]
+
+    kept = [upload("first.jpg"), upload("second.jpg")]
+    rejected = [upload(f"burst{i}.jpg") for i in range(5)]
+    assert all(job["error"] == "frame is busy, try again shortly" for job in rejected)
+
+    release.set()
+    deadline = time.monotonic() + 30
+    while len(saved) < 2 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    server.stop()
+    assert saved == ["first", "second"]
+    for job in kept:
+        assert client.get(f"/status/{job['id']}").get_json()["state"] == "done"
+    assert not list(spool.iterdir())
+
+
+@pytest.fixture
+def server(tmp_path):
+    records = []
+    arrived = threading.Event()
+
+    def on_record(record):
+        records.append(record)
+        arrived.set()
+
+    images = tmp_path / "imgs"
+    images.mkdir()
+    port = free_port()
+    process = UploadServerProcess(str(images), on_record, port=port,
+                                  spool_dir=str(tmp_path / "spool"))
+    process.start()
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while True:
+        try:
+            get(base + "/")
+            break
+        except (urllib.error.URLError, ConnectionError):
+            if time.monotonic() > deadline:
+                process.stop()
+                pytest.fail("upload server process did not come up")
+            time.sleep(0.2)
+    yield base, records, arrived
+    process.stop()
+
+
+def test_upload_reaches_the_parent(server):
+    base, records, arrived = server
+    jobs = post_file(base + "/upload", "blue_sky.jpg", jpeg_bytes())["jobs"]
+    assert len(jobs) == 1 and jobs[0]["state"] != "failed"
+
+    assert arrived.wait(60)
+    record = records[0]
+    assert record.title == "blue sky"
+    _, body = get(f"{base}/status/{jobs[0]['id']}")
+    assert json.loads(body)["state"] == "done"
+    status, thumbnail = get(f"{base}/api/records/{record.uuid}/thumbnail")
+    assert status == 200 and Image.open(io.BytesIO(thumbnail)).format == "JPEG"